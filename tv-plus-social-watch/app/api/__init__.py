@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.services.db import ping as db_ping
+from app.services.db import ping as db_ping, pool_stats
 
 router = APIRouter(prefix="/db", tags=["db"])
 
@@ -10,3 +10,8 @@ async def ping():
     return {"status": "ok", "now": now}
 
 
+
+
+@router.get("/pool")
+async def pool():
+    return pool_stats()
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException, Request
+from app.core.config import settings
+from app.services.catalog_ingest import FORMATS, LineTooLong, aiter_lines, aiter_records, ingest, log_progress
+
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+
+@router.post("/ingest")
+async def ingest_catalog(request: Request, format: str = "csv", batch_size: int | None = None):
+    """Load a provider feed (CSV with header, or JSONL) streamed in the request body"""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    records = aiter_records(aiter_lines(request.stream()), format)
+    try:
+        return await ingest(
+            records,
+            batch_size=max(1, batch_size or settings.catalog_ingest_batch_size),
+            on_progress=log_progress,
+        )
+    except LineTooLong as e:
+        # Batches before the long line are already committed; re-sending the feed is safe
+        raise HTTPException(status_code=413, detail=str(e))
@@ -1,7 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import base64
 from app.services.db import get_cursor
+from app.services.versions import versions, CHAT
+from app.api.etag import check_etag
+from app.api.export import export_response
 from datetime import datetime
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -19,47 +23,133 @@ class EmojiMessage(BaseModel):
     emoji: str
 
 
+MAX_PAGE_SIZE = 200
+# Larger than any bigserial id; see _bound_id
+_MAX_ID = 2 ** 63 - 1
+
+# Both streams are merged in SQL and ordered by (created_at, kind, id);
+# each branch reads its own (room_id, created_at, id) index in that order.
+_TIMELINE_SQL = """
+SELECT kind, id, user_id, content, created_at FROM (
+    (SELECT 'chat' AS kind, id, user_id, message AS content, created_at
+     FROM chat
+     WHERE room_id = %(room_id)s {chat_filter}
+     ORDER BY created_at {direction}, id {direction}
+     LIMIT %(limit)s)
+    UNION ALL
+    (SELECT 'emoji' AS kind, id, user_id, emoji AS content, created_at
+     FROM emojis
+     WHERE room_id = %(room_id)s {emoji_filter}
+     ORDER BY created_at {direction}, id {direction}
+     LIMIT %(limit)s)
+) timeline
+ORDER BY created_at {direction}, kind {direction}, id {direction}
+LIMIT %(limit)s
+"""
+
+
+def _encode_cursor(row) -> str:
+    raw = f"{row['created_at'].isoformat()}|{row['kind']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, kind, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        if kind not in ("chat", "emoji"):
+            raise ValueError(kind)
+        return datetime.fromisoformat(created_at), kind, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _bound_id(branch: str, kind: str, row_id: int) -> int:
+    """Per-branch id bound that makes ``(created_at, id)`` compare like the full key.
+
+    Rows at the cursor's timestamp sort by kind first, so in the cursor's own
+    stream the id decides; an earlier-sorting stream compares as if its ids
+    were all below the cursor, a later-sorting one as if all above.
+    """
+    if branch == kind:
+        return row_id
+    return _MAX_ID if branch < kind else 0
+
+
 @router.get("/{room_id}/messages")
-async def get_chat_messages(room_id: str, limit: int = 50) -> Dict[str, List[Dict]]:
-    """Get recent chat messages for a room"""
-    async with get_cursor() as cur:
-        await cur.execute(
-            "SELECT user_id, message, created_at FROM chat "
-            "WHERE room_id = %s ORDER BY created_at DESC LIMIT %s",
-            (room_id, limit)
-        )
-        messages = await cur.fetchall()
-        
-        await cur.execute(
-            "SELECT user_id, emoji, created_at FROM emojis "
-            "WHERE room_id = %s ORDER BY created_at DESC LIMIT %s",
-            (room_id, limit)
+async def get_chat_messages(
+    room_id: str,
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> Dict:
+    """Get chat messages and emojis for a room, newest first.
+
+    Without cursors this is the latest page. ``before`` pages back into
+    history and ``after`` fetches what arrived since; use the returned
+    ``next_before`` / ``next_after`` cursors to continue.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    not_modified = check_etag(request, response, room_id, CHAT, f"limit{limit}-b{before or ''}-a{after or ''}")
+    if not_modified:
+        return not_modified
+
+    cursor = before or after
+    params = {"room_id": room_id, "limit": limit}
+    chat_filter = emoji_filter = ""
+    if cursor:
+        created_at, kind, row_id = _decode_cursor(cursor)
+        op = "<" if before else ">"
+        chat_filter = f"AND (created_at, id) {op} (%(ts)s, %(chat_id)s)"
+        emoji_filter = f"AND (created_at, id) {op} (%(ts)s, %(emoji_id)s)"
+        params.update(
+            ts=created_at,
+            chat_id=_bound_id("chat", kind, row_id),
+            emoji_id=_bound_id("emoji", kind, row_id),
         )
-        emojis = await cur.fetchall()
-    
-    # Combine and sort by timestamp
-    all_messages = []
-    
-    for msg in messages:
-        all_messages.append({
-            "type": "chat",
-            "user_id": msg["user_id"],
-            "content": msg["message"],
-            "timestamp": msg["created_at"].isoformat()
-        })
-    
-    for emoji in emojis:
-        all_messages.append({
-            "type": "emoji", 
-            "user_id": emoji["user_id"],
-            "content": emoji["emoji"],
-            "timestamp": emoji["created_at"].isoformat()
-        })
-    
-    # Sort by timestamp (newest first)
-    all_messages.sort(key=lambda x: x["timestamp"], reverse=True)
-    
-    return {"messages": all_messages[:limit]}
+
+    sql = _TIMELINE_SQL.format(
+        chat_filter=chat_filter,
+        emoji_filter=emoji_filter,
+        direction="ASC" if after else "DESC",
+    )
+    async with get_cursor() as cur:
+        await cur.execute(sql, params)
+        rows = await cur.fetchall()
+
+    if after:
+        # Fetched oldest-first to get the rows right after the cursor
+        rows.reverse()
+
+    messages = [
+        {
+            "type": row["kind"],
+            "user_id": row["user_id"],
+            "content": row["content"],
+            "timestamp": row["created_at"].isoformat()
+        }
+        for row in rows
+    ]
+
+    return {
+        "messages": messages,
+        # None once history is exhausted
+        "next_before": _encode_cursor(rows[-1]) if len(rows) == limit else None,
+        "next_after": _encode_cursor(rows[0]) if rows else after,
+    }
+
+
+@router.get("/{room_id}/export")
+async def export_chat(room_id: str, kind: str = "chat", format: str = "csv"):
+    """Full chat (``kind=chat``) or emoji (``kind=emoji``) history as a streamed download"""
+    if kind not in ("chat", "emoji"):
+        raise HTTPException(status_code=400, detail="kind must be chat or emoji")
+    return export_response("chat" if kind == "chat" else "emojis", room_id, format)
 
 
 @router.post("/message")
@@ -71,6 +161,7 @@ async def send_chat_message(message: ChatMessage):
             (message.room_id, message.user_id, message.message, datetime.now())
         )
         await cur.connection.commit()
+    versions.bump(message.room_id, CHAT)
     
     return {"status": "sent", "timestamp": datetime.now().isoformat()}
 
@@ -84,5 +175,6 @@ async def send_emoji(emoji: EmojiMessage):
             (emoji.room_id, emoji.user_id, emoji.emoji, datetime.now())
         )
         await cur.connection.commit()
+    versions.bump(emoji.room_id, CHAT)
     
     return {"status": "sent", "timestamp": datetime.now().isoformat()}
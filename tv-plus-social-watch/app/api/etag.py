@@ -0,0 +1,35 @@
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.services.versions import versions
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def check_etag(request: Request, response: Response, room_id: str, resource: str, variant: str = "") -> Optional[Response]:
+    """Tag the response with the resource's current version.
+
+    Returns a ready 304 response when the client already has this version,
+    before any database work; otherwise returns None and the route builds
+    the body as usual. Call it before reading, so a write that races the
+    read can only make the tag older than the body, never newer.
+    """
+    etag = versions.etag(room_id, resource, variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,6 +1,10 @@
-from fastapi import APIRouter
+from decimal import Decimal
+from fastapi import APIRouter, Request, Response
 from pydantic import BaseModel
-from app.services.split_service import list_expenses, add_expense, calc_balances
+from app.services.split_service import list_expenses, add_expense, calc_balances, settlement_plan
+from app.services.versions import EXPENSES
+from app.api.etag import check_etag
+from app.api.export import export_response
 
 
 router = APIRouter(tags=["expenses"])
@@ -8,25 +12,47 @@ router = APIRouter(tags=["expenses"])
 
 class ExpenseBody(BaseModel):
     user_id: str
-    amount: float
+    # Decimal keeps amounts exact from the JSON body to the ledger
+    amount: Decimal
     note: str
-    weight: float = 1.0
+    weight: Decimal = Decimal("1.0")
 
 
 @router.get("/rooms/{room_id}/expenses")
-async def get_expenses(room_id: str):
+async def get_expenses(room_id: str, request: Request, response: Response):
+    not_modified = check_etag(request, response, room_id, EXPENSES, "list")
+    if not_modified:
+        return not_modified
     return {"expenses": await list_expenses(room_id)}
 
 
+@router.get("/rooms/{room_id}/expenses/export")
+async def export_expenses(room_id: str, format: str = "csv"):
+    """Every expense of the room as a streamed CSV or NDJSON download"""
+    return export_response("expenses", room_id, format)
+
+
 @router.get("/rooms/{room_id}/balances")
-async def get_balances(room_id: str):
+async def get_balances(room_id: str, request: Request, response: Response):
+    not_modified = check_etag(request, response, room_id, EXPENSES, "balances")
+    if not_modified:
+        return not_modified
     totals = await calc_balances(room_id)
     return {
-        "totals": sum(float(b["net"]) for b in totals),
+        "totals": float(sum((Decimal(b["net"]) for b in totals), Decimal(0))),
         "per_user": totals
     }
 
 
+@router.get("/rooms/{room_id}/settlement")
+async def get_settlement(room_id: str, request: Request, response: Response):
+    """Transfers that settle the balances, at most one fewer than the members"""
+    not_modified = check_etag(request, response, room_id, EXPENSES, "settlement")
+    if not_modified:
+        return not_modified
+    return {"transfers": await settlement_plan(room_id)}
+
+
 @router.post("/rooms/{room_id}/expenses")
 async def post_expense(room_id: str, body: ExpenseBody):
     import time
@@ -0,0 +1,16 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.exports import FORMATS, export_stream
+
+
+def export_response(name: str, room_id: str, fmt: str) -> StreamingResponse:
+    """Stream one room's ``name`` history as a CSV or NDJSON download"""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    return StreamingResponse(
+        export_stream(name, room_id, fmt, settings.export_batch_size),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{room_id}-{name}.{fmt}"'},
+    )
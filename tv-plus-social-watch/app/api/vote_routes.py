@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from pydantic import BaseModel
-from app.services.voting_service import list_candidates, record_vote, tally_votes, get_winner
+from app.services.voting_service import list_candidates, add_candidates as svc_add_candidates, record_vote, record_votes, tally_votes, get_winner
+from app.services.versions import CANDIDATES, VOTES
+from app.api.etag import check_etag
 
 
 router = APIRouter(prefix="/votes", tags=["votes"])
@@ -12,33 +14,34 @@ class VoteBody(BaseModel):
     user_id: str
 
 
+class BulkVoteBody(BaseModel):
+    votes: list[VoteBody]
+
+
 class AddCandidatesBody(BaseModel):
     items: list[str]  # List of content_ids
 
 
 @router.get("/{room_id}/candidates")
-async def get_candidates(room_id: str):
+async def get_candidates(room_id: str, request: Request, response: Response):
+    not_modified = check_etag(request, response, room_id, CANDIDATES)
+    if not_modified:
+        return not_modified
     return {"candidates": await list_candidates(room_id)}
 
 
 @router.post("/{room_id}/candidates")
 async def add_candidates(room_id: str, body: AddCandidatesBody):
     """Add candidate contents to a room for voting"""
-    from app.services.db import get_cursor
-    
-    async with get_cursor() as cur:
-        for content_id in body.items:
-            await cur.execute(
-                "INSERT INTO candidates (room_id, content_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (room_id, content_id)
-            )
-        await cur.connection.commit()
-    
-    return {"status": "ok", "added": len(body.items)}
+    result = await svc_add_candidates(room_id, body.items)
+    return {"status": "ok", "added": len(result["inserted"]), **result}
 
 
 @router.get("/{room_id}/tally")
-async def get_tally(room_id: str):
+async def get_tally(room_id: str, request: Request, response: Response):
+    not_modified = check_etag(request, response, room_id, VOTES)
+    if not_modified:
+        return not_modified
     return {"tally": await tally_votes(room_id)}
 
 
@@ -59,7 +62,39 @@ async def get_vote_winner(room_id: str, request: Request):
 
 
 @router.post("")
-async def post_vote(body: VoteBody):
-    return await record_vote(body.room_id, body.content_id, body.user_id)
-
-
+async def post_vote(body: VoteBody, request: Request):
+    result = await record_vote(body.room_id, body.content_id, body.user_id)
+    
+    # Push the new tally instead of having every client re-poll it
+    manager = request.app.state.manager
+    tally = await tally_votes(body.room_id)
+    await manager.broadcast_to_room(body.room_id, {
+        "type": "vote_tally",
+        "vote": {"user_id": body.user_id, "content_id": body.content_id},
+        "tally": tally,
+        "total_voted": sum(int(item["votes"]) for item in tally)
+    })
+    return result
+
+
+@router.post("/bulk")
+async def post_votes_bulk(body: BulkVoteBody, request: Request):
+    """Apply many votes in one statement (load tests, imports from other frontends)"""
+    by_room = await record_votes([(v.room_id, v.content_id, v.user_id) for v in body.votes])
+
+    # One push per room. The votes themselves are not listed: hundreds of them
+    # would not fit in a NOTIFY payload, so other workers reload the room instead
+    manager = request.app.state.manager
+    for room_id in by_room:
+        tally = await tally_votes(room_id)
+        await manager.broadcast_to_room(room_id, {
+            "type": "vote_tally",
+            "reload": True,
+            "tally": tally,
+            "total_voted": sum(int(item["votes"]) for item in tally)
+        })
+    return {
+        "status": "ok",
+        "applied": sum(len(votes) for votes in by_room.values()),
+        "rooms": {room_id: len(votes) for room_id, votes in by_room.items()}
+    }
@@ -2,24 +2,114 @@ from pydantic import BaseModel
 import os
 
 
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 class Settings(BaseModel):
     app_name: str = "tv-plus-watch-party"
     debug: bool = True
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = 1
     database_url: str | None = None
     db_host: str | None = None
     db_user: str | None = None
     db_password: str | None = None
     db_port: int = 5432
     db_database: str = "postgres"
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_timeout: float = 10.0
+    db_pool_max_lifetime: float = 1800.0
+    db_pool_max_idle: float = 300.0
+    db_pool_check: bool = True
+    db_migrate_on_startup: bool = True
+    seed_on_startup: bool = False
+    catalog_ingest_batch_size: int = 5000
+    export_batch_size: int = 1000
+    export_max_concurrent: int = 4
+    export_statement_timeout: float = 30.0
+    export_idle_timeout: float = 60.0
+    ws_backend: str = "memory"
+    ws_notify_channel: str = "tv_plus_rooms"
+    ws_presence_interval: float = 10.0
+    ws_send_queue_size: int = 256
+    ws_slow_consumer_policy: str = "drop_oldest"
+    ws_per_message_deflate: bool = True
+    ws_rate_chat_burst: float = 3.0
+    ws_rate_chat_per_sec: float = 0.5
+    ws_rate_emoji_burst: float = 10.0
+    ws_rate_emoji_per_sec: float = 5.0
+    ws_rate_playback_burst: float = 30.0
+    ws_rate_playback_per_sec: float = 20.0
+    ws_rate_max_buckets: int = 50000
+    ws_rate_idle_ttl: float = 300.0
+    ws_emoji_window: float = 0.25
+    ws_playback_window: float = 0.2
+    ws_playback_leading: bool = True
+    chat_flush_batch_size: int = 500
+    chat_flush_interval: float = 0.5
+    chat_queue_size: int = 10000
+    vote_reconcile_interval: float = 30.0
+    vote_tally_idle_ttl: float = 600.0
+    cache_ttl: float = 300.0
+    catalog_cache_size: int = 10000
+    candidates_cache_size: int = 1000
+    summary_cache_size: int = 1000
+    etag_versions_size: int = 100000
 
 
 settings = Settings(
+    host=os.getenv("HOST", "127.0.0.1"),
+    port=int(os.getenv("PORT", "8000")),
+    workers=int(os.getenv("WORKERS", "1")),
     database_url=os.getenv("DATABASE_URL"),
     db_host=os.getenv("DB_HOST"),
     db_user=os.getenv("DB_USER"),
     db_password=os.getenv("DB_PASSWORD"),
     db_port=int(os.getenv("DB_PORT", "5432")),
     db_database=os.getenv("DB_DATABASE", "postgres"),
+    db_pool_min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+    db_pool_max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    db_pool_max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+    db_pool_max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    db_pool_check=_env_flag("DB_POOL_CHECK", "true"),
+    db_migrate_on_startup=_env_flag("DB_MIGRATE_ON_STARTUP", "true"),
+    seed_on_startup=_env_flag("SEED_ON_STARTUP", "false"),
+    catalog_ingest_batch_size=int(os.getenv("CATALOG_INGEST_BATCH_SIZE", "5000")),
+    export_batch_size=int(os.getenv("EXPORT_BATCH_SIZE", "1000")),
+    export_max_concurrent=int(os.getenv("EXPORT_MAX_CONCURRENT", "4")),
+    export_statement_timeout=float(os.getenv("EXPORT_STATEMENT_TIMEOUT", "30")),
+    export_idle_timeout=float(os.getenv("EXPORT_IDLE_TIMEOUT", "60")),
+    ws_backend=os.getenv("WS_BACKEND", "memory"),
+    ws_notify_channel=os.getenv("WS_NOTIFY_CHANNEL", "tv_plus_rooms"),
+    ws_presence_interval=float(os.getenv("WS_PRESENCE_INTERVAL", "10")),
+    ws_send_queue_size=int(os.getenv("WS_SEND_QUEUE_SIZE", "256")),
+    ws_slow_consumer_policy=os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest"),
+    ws_per_message_deflate=_env_flag("WS_PER_MESSAGE_DEFLATE", "true"),
+    ws_rate_chat_burst=float(os.getenv("WS_RATE_CHAT_BURST", "3")),
+    ws_rate_chat_per_sec=float(os.getenv("WS_RATE_CHAT_PER_SEC", "0.5")),
+    ws_rate_emoji_burst=float(os.getenv("WS_RATE_EMOJI_BURST", "10")),
+    ws_rate_emoji_per_sec=float(os.getenv("WS_RATE_EMOJI_PER_SEC", "5")),
+    ws_rate_playback_burst=float(os.getenv("WS_RATE_PLAYBACK_BURST", "30")),
+    ws_rate_playback_per_sec=float(os.getenv("WS_RATE_PLAYBACK_PER_SEC", "20")),
+    ws_rate_max_buckets=int(os.getenv("WS_RATE_MAX_BUCKETS", "50000")),
+    ws_rate_idle_ttl=float(os.getenv("WS_RATE_IDLE_TTL", "300")),
+    ws_emoji_window=float(os.getenv("WS_EMOJI_WINDOW", "0.25")),
+    ws_playback_window=float(os.getenv("WS_PLAYBACK_WINDOW", "0.2")),
+    ws_playback_leading=_env_flag("WS_PLAYBACK_LEADING", "true"),
+    chat_flush_batch_size=int(os.getenv("CHAT_FLUSH_BATCH_SIZE", "500")),
+    chat_flush_interval=float(os.getenv("CHAT_FLUSH_INTERVAL", "0.5")),
+    chat_queue_size=int(os.getenv("CHAT_QUEUE_SIZE", "10000")),
+    vote_reconcile_interval=float(os.getenv("VOTE_RECONCILE_INTERVAL", "30")),
+    vote_tally_idle_ttl=float(os.getenv("VOTE_TALLY_IDLE_TTL", "600")),
+    cache_ttl=float(os.getenv("CACHE_TTL", "300")),
+    catalog_cache_size=int(os.getenv("CATALOG_CACHE_SIZE", "10000")),
+    candidates_cache_size=int(os.getenv("CANDIDATES_CACHE_SIZE", "1000")),
+    summary_cache_size=int(os.getenv("SUMMARY_CACHE_SIZE", "1000")),
+    etag_versions_size=int(os.getenv("ETAG_VERSIONS_SIZE", "100000")),
 )
 
 
@@ -0,0 +1,35 @@
+from bisect import bisect_left
+from typing import Dict, Sequence
+
+
+# Upper bounds in milliseconds; anything slower lands in the "+Inf" bucket
+DEFAULT_BUCKETS_MS: Sequence[float] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, cheap enough to update on every request"""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        self._bounds = list(buckets_ms)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self._counts[bisect_left(self._bounds, ms)] += 1
+        self._count += 1
+        self._sum_ms += ms
+        if ms > self._max_ms:
+            self._max_ms = ms
+
+    def snapshot(self) -> Dict:
+        buckets = {f"le_{bound:g}ms": n for bound, n in zip(self._bounds, self._counts)}
+        buckets["le_inf"] = self._counts[-1]
+        return {
+            "count": self._count,
+            "avg_ms": round(self._sum_ms / self._count, 3) if self._count else 0.0,
+            "max_ms": round(self._max_ms, 3),
+            "buckets": buckets,
+        }
@@ -0,0 +1,129 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+MISSING = object()
+
+
+class ReadThroughCache:
+    """Size-bounded in-process cache with LRU and TTL eviction.
+
+    ``get_or_load`` returns the cached value or awaits ``loader`` once,
+    sharing the load between concurrent callers. ``invalidate`` drops a
+    key here and tells listeners (registered with ``on_invalidate``) so
+    other workers can drop it too. A load that was already in flight when
+    its key was invalidated still answers the callers waiting on it, but
+    is not stored and is not joined by later callers, who start a fresh
+    load instead.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000, ttl: float = 300.0) -> None:
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        # Only the load started since the key was last invalidated is listed
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+        self._listeners: List[Callable[[str, Hashable], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.ensure_future(self._load(key, loader))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        except BaseException:
+            if self._loading.get(key) is task:
+                del self._loading[key]
+            raise
+        # Still listed means the key was not invalidated while loading
+        if self._loading.get(key) is task:
+            del self._loading[key]
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable, propagate: bool = True) -> None:
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+        if propagate:
+            for listener in self._listeners:
+                listener(self.name, key)
+
+    def clear(self, propagate: bool = True) -> None:
+        self._entries.clear()
+        self._loading.clear()
+        if propagate:
+            for listener in self._listeners:
+                listener(self.name, None)
+
+    def on_invalidate(self, listener: Callable[[str, Hashable], None]) -> None:
+        """``listener(cache_name, key)``; key is None when the whole cache was cleared"""
+        self._listeners.append(listener)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+caches: Dict[str, ReadThroughCache] = {}
+
+
+def register_cache(name: str, max_entries: int, ttl: float) -> ReadThroughCache:
+    cache = caches[name] = ReadThroughCache(name, max_entries, ttl)
+    return cache
+
+
+def invalidate_remote(name: str, key: Hashable) -> None:
+    """Apply an invalidation announced by another worker"""
+    cache = caches.get(name)
+    if cache is None:
+        return
+    if key is None:
+        cache.clear(propagate=False)
+    else:
+        cache.invalidate(key, propagate=False)
+
+
+def cache_stats() -> Dict:
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,258 @@
+"""Bulk catalog ingest from provider feeds.
+
+Input (CSV with a header row, or JSON Lines) is consumed as a stream of
+lines, so memory stays bounded by ``batch_size`` whatever the feed size;
+a line longer than ``MAX_LINE_SIZE`` stops the ingest with ``LineTooLong``.
+Each batch is COPYed into a temporary staging table and merged into
+``catalog`` with one upsert; only rows whose values changed are written.
+"""
+import csv
+import json
+import time
+import codecs
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .db import get_connection
+from .cache import caches
+from .csv_utils import MAX_RECORD_SIZE, RecordAssembler, RecordTooLarge
+from .versions import versions, ALL_ROOMS, CANDIDATES
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+
+# Longest physical line buffered while waiting for its newline
+MAX_LINE_SIZE = MAX_RECORD_SIZE
+
+# catalog.duration_min is an int4
+DURATION_RANGE = (-2**31, 2**31 - 1)
+
+# (content_id, title, type, duration_min, tags)
+CatalogRow = Tuple[str, Optional[str], Optional[str], Optional[int], str]
+
+_UPSERT_SQL = """
+INSERT INTO catalog (content_id, title, type, duration_min, tags)
+SELECT DISTINCT ON (content_id) content_id, title, type, duration_min, tags
+FROM catalog_staging
+ORDER BY content_id, seq DESC
+ON CONFLICT (content_id) DO UPDATE SET
+    title = EXCLUDED.title,
+    type = EXCLUDED.type,
+    duration_min = EXCLUDED.duration_min,
+    tags = EXCLUDED.tags
+WHERE (catalog.title, catalog.type, catalog.duration_min, catalog.tags)
+    IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.type, EXCLUDED.duration_min, EXCLUDED.tags)
+"""
+
+
+def normalize_tags(raw: Any) -> str:
+    """Lower-case, trimmed, de-duplicated tags joined with commas (catalog format)"""
+    if raw is None:
+        return ""
+    if isinstance(raw, str):
+        for separator in (";", "|"):
+            raw = raw.replace(separator, ",")
+        raw = raw.split(",")
+    tags: List[str] = []
+    for tag in raw:
+        tag = str(tag).strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return ",".join(tags)
+
+
+def normalize_row(raw: Dict[str, Any]) -> Optional[CatalogRow]:
+    """Catalog row from one feed record, or None if it cannot be used"""
+    content_id = str(raw.get("content_id") or "").strip()
+    if not content_id:
+        return None
+    duration = raw.get("duration_min")
+    if duration in (None, ""):
+        duration_min = None
+    else:
+        try:
+            duration_min = int(float(duration))
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if not DURATION_RANGE[0] <= duration_min <= DURATION_RANGE[1]:
+            return None
+    title = str(raw.get("title") or "").strip() or None
+    content_type = str(raw.get("type") or "").strip().lower() or None
+    return (content_id, title, content_type, duration_min, normalize_tags(raw.get("tags")))
+
+
+class LineTooLong(ValueError):
+    """A feed line grew past ``max_line_size`` without a newline"""
+
+
+async def aiter_lines(chunks: AsyncIterable[bytes], max_line_size: int = MAX_LINE_SIZE) -> AsyncIterator[str]:
+    """Decode a byte stream into lines (endings kept), one chunk at a time.
+
+    Only newly decoded text is searched for newlines; an unfinished line is
+    kept as a list of parts and may not grow past ``max_line_size``.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parts: List[str] = []
+    size = 0
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        start = 0
+        end = text.find("\n")
+        while end != -1:
+            parts.append(text[start:end + 1])
+            yield "".join(parts)
+            parts, size = [], 0
+            start = end + 1
+            end = text.find("\n", start)
+        if start < len(text):
+            size += len(text) - start
+            if size > max_line_size:
+                raise LineTooLong(f"Feed line longer than {max_line_size} characters")
+            parts.append(text[start:])
+    parts.append(decoder.decode(b"", final=True))
+    tail = "".join(parts)
+    if tail:
+        yield tail
+
+
+async def aiter_file_lines(path: str, max_line_size: int = MAX_LINE_SIZE) -> AsyncIterator[str]:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        while True:
+            line = f.readline(max_line_size + 1)
+            if not line:
+                return
+            if len(line) > max_line_size and not line.endswith("\n"):
+                raise LineTooLong(f"Feed line longer than {max_line_size} characters")
+            yield line
+
+
+async def aiter_records(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Dict[str, Any]]:
+    """Feed records as dicts; CSV takes its field names from the header row"""
+    if fmt == "jsonl":
+        async for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            # Unparseable lines still count, and are rejected by normalize_row
+            yield record if isinstance(record, dict) else {}
+        return
+
+    assembler = RecordAssembler()
+    header: Optional[List[str]] = None
+
+    def parse(record: str) -> List[str]:
+        return next(csv.reader([record]), [])
+
+    async for line in lines:
+        try:
+            record = assembler.feed(line)
+        except RecordTooLarge:
+            # Counted and rejected like any other unusable record
+            if header is not None:
+                yield {}
+            continue
+        if record is None or not record.strip():
+            continue
+        fields = parse(record)
+        if header is None:
+            header = [name.strip() for name in fields]
+            continue
+        yield dict(zip(header, fields))
+    leftover = assembler.flush()
+    if leftover and leftover.strip() and header is not None:
+        yield dict(zip(header, parse(leftover)))
+
+
+class IngestStats:
+    __slots__ = ("received", "rejected", "staged", "written", "batches", "started")
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.rejected = 0
+        self.staged = 0
+        self.written = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "staged": self.staged,
+            # Inserted or changed; the rest of the staged rows were identical
+            "written": self.written,
+            "unchanged": self.staged - self.written,
+            "batches": self.batches,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(self.received / elapsed) if elapsed else 0,
+        }
+
+
+async def _load_batch(batch: List[CatalogRow]) -> int:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "CREATE TEMP TABLE catalog_staging ("
+                "seq int4, content_id varchar, title varchar, type varchar, duration_min int4, tags text"
+                ") ON COMMIT DROP"
+            )
+            async with cur.copy(
+                "COPY catalog_staging (seq, content_id, title, type, duration_min, tags) FROM STDIN"
+            ) as copy:
+                for seq, row in enumerate(batch):
+                    await copy.write_row((seq, *row))
+            await cur.execute(_UPSERT_SQL)
+            written = cur.rowcount
+        await conn.commit()
+    return written
+
+
+async def ingest(
+    records: AsyncIterable[Dict[str, Any]],
+    batch_size: int = 5000,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Normalize, stage and upsert feed records in batches of ``batch_size``"""
+    stats = IngestStats()
+    batch: List[CatalogRow] = []
+
+    async def flush() -> None:
+        stats.written += await _load_batch(batch)
+        stats.staged += len(batch)
+        stats.batches += 1
+        batch.clear()
+        if on_progress is not None:
+            on_progress(stats.as_dict())
+
+    try:
+        async for record in records:
+            stats.received += 1
+            row = normalize_row(record)
+            if row is None:
+                stats.rejected += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+    finally:
+        if stats.written:
+            # Titles and tags may have changed under cached lists and summaries
+            for cache in caches.values():
+                cache.clear()
+            versions.bump(ALL_ROOMS, CANDIDATES)
+    return stats.as_dict()
+
+
+def log_progress(progress: Dict[str, Any]) -> None:
+    logger.info(
+        "Catalog ingest: %d received, %d written, %d rejected (%d rows/s)",
+        progress["received"], progress["written"], progress["rejected"], progress["rows_per_sec"]
+    )
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg
+from psycopg import sql
+
+from .db import get_connection
+from .versions import versions, CHAT as CHAT_RESOURCE
+
+logger = logging.getLogger(__name__)
+
+CHAT = "chat"
+EMOJI = "emoji"
+SYNC = "sync"
+
+# kind -> (table, columns)
+TABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    CHAT: ("chat", ("room_id", "user_id", "message", "created_at")),
+    EMOJI: ("emojis", ("room_id", "user_id", "emoji", "created_at")),
+    SYNC: ("sync_events", ("room_id", "user_id", "action", "ts", "position_sec")),
+}
+
+# (kind, column values in TABLES order)
+Row = Tuple[str, Tuple[Any, ...]]
+
+
+class ChatHistoryWriter:
+    """Write-behind buffer for room history received over WebSocket.
+
+    ``record`` only enqueues; a background task COPYs the rows into the
+    ``chat``, ``emojis`` and ``sync_events`` tables in batches, flushing when ``batch_size``
+    rows are waiting or ``flush_interval`` seconds have passed. The queue is
+    bounded; while the database is stalled and it is full, new rows are
+    dropped (and counted) so senders never wait on it. Each batch is COPYed
+    into a staging table and only rows whose room and user exist are kept,
+    so one client with an unknown id cannot fail everybody's batch.
+    ``stop`` drains whatever is still queued.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.5, max_queue: int = 10000) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.batches = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop the background task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        leftovers = [row for row in self._drain() if row is not None]
+        if leftovers:
+            await self._flush(leftovers)
+
+    def record(self, kind: str, room_id: str, user_id: str, content: str, created_at: datetime) -> bool:
+        """Queue a chat message or emoji; False if the queue was full and it was dropped"""
+        return self._put((kind, (room_id, user_id, content, created_at)))
+
+    def record_sync(self, room_id: str, user_id: str, action: str, ts: datetime, position_sec: int) -> bool:
+        """Queue a playback transition for ``sync_events``"""
+        return self._put((SYNC, (room_id, user_id, action, ts, position_sec)))
+
+    def _put(self, row: Row) -> bool:
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            # Unknown room or user, skipped at insert time
+            "rejected": self.rejected,
+            # Queue full (database behind), never queued
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+    def _drain(self) -> List[Optional[Row]]:
+        rows = []
+        while not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                return
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    row = self._queue.get_nowait()
+                if row is None:
+                    # stop() was called: write this batch and exit
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Row]) -> None:
+        if not batch:
+            return
+        by_kind: Dict[str, List[Tuple[Any, ...]]] = {}
+        for kind, values in batch:
+            by_kind.setdefault(kind, []).append(values)
+        try:
+            written = 0
+            async with get_connection() as conn:
+                async with conn.cursor() as cur:
+                    for kind, rows in by_kind.items():
+                        await cur.execute(_staging_statement(kind))
+                        async with cur.copy(_copy_statement(kind)) as copy:
+                            for values in rows:
+                                await copy.write_row(values)
+                        await cur.execute(_merge_statement(kind))
+                        written += cur.rowcount
+            self.written += written
+            self.rejected += len(batch) - written
+            self.batches += 1
+        except Exception:
+            # Not a foreign key problem (those are filtered); retry row by row
+            logger.exception("Batch insert of %d history rows failed, retrying individually", len(batch))
+            await self._flush_rows(batch)
+        # Chat history readers revalidate against the new rows
+        for room_id in {values[0] for kind, values in batch if kind in (CHAT, EMOJI)}:
+            versions.bump(room_id, CHAT_RESOURCE)
+
+    async def _flush_rows(self, batch: List[Row]) -> None:
+        pending = len(batch)
+        try:
+            async with get_connection() as conn:
+                for kind, values in batch:
+                    try:
+                        async with conn.transaction():
+                            await conn.execute(_insert_statement(kind), values)
+                        self.written += 1
+                    except psycopg.Error:
+                        self.failed += 1
+                    pending -= 1
+        except Exception:
+            logger.exception("Could not persist %d history rows", pending)
+            self.failed += pending
+
+
+def _staging_table(kind: str) -> sql.Identifier:
+    return sql.Identifier(f"history_staging_{kind}")
+
+
+def _staging_statement(kind: str) -> sql.Composed:
+    table, columns = TABLES[kind]
+    return sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+        _staging_table(kind), sql.SQL(", ").join(map(sql.Identifier, columns)), sql.Identifier(table)
+    )
+
+
+def _copy_statement(kind: str) -> sql.Composed:
+    _, columns = TABLES[kind]
+    return sql.SQL("COPY {} ({}) FROM STDIN").format(
+        _staging_table(kind), sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+
+
+def _merge_statement(kind: str) -> sql.Composed:
+    """Move staged rows into the table, skipping those that would break its foreign keys"""
+    table, columns = TABLES[kind]
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    return sql.SQL(
+        "INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} s"
+        " WHERE EXISTS (SELECT 1 FROM rooms r WHERE r.room_id = s.room_id)"
+        " AND EXISTS (SELECT 1 FROM users u WHERE u.user_id = s.user_id)"
+    ).format(table=sql.Identifier(table), columns=column_list, staging=_staging_table(kind))
+
+
+def _insert_statement(kind: str) -> sql.Composed:
+    table, columns = TABLES[kind]
+    return sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(map(sql.Identifier, columns)),
+        sql.SQL(", ").join(sql.Placeholder() * len(columns)),
+    )
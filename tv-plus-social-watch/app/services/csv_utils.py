@@ -1,28 +1,262 @@
 import csv
-from pathlib import Path
+import io
 import os
-from typing import List, Dict
+import mmap
+import atexit
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 
 DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
 
+# Read buffer for streaming readers; rows are parsed from it one at a time
+READ_CHUNK_SIZE = 1 << 20
+# Longest record RecordAssembler will hold while waiting for a quote to close
+MAX_RECORD_SIZE = 1 << 20
 
-def read_csv(filename: str) -> List[Dict[str, str]]:
+# When a batched writer calls flush()/fsync()
+FLUSH_ROW = "row"          # after every row (append_csv semantics)
+FLUSH_BATCH = "batch"      # when batch_size rows are buffered
+FLUSH_MANUAL = "manual"    # only on flush() / close()
+FSYNC_NEVER = "never"
+FSYNC_BATCH = "batch"      # fsync after each flush to disk
+FSYNC_CLOSE = "close"      # once, on close
+
+
+def iter_csv(filename: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, str]]:
+    """Yield rows one at a time; memory stays flat whatever the file size"""
     path = DATA_DIR / filename
     if not path.exists():
-        return []
-    with path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+        return
+    with io.open(path, newline="", encoding="utf-8", buffering=chunk_size) as f:
+        yield from csv.DictReader(f)
+
+
+def iter_csv_batches(filename: str, batch_size: int = 1000) -> Iterator[List[Dict[str, str]]]:
+    batch: List[Dict[str, str]] = []
+    for row in iter_csv(filename):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_csv(filename: str) -> List[Dict[str, str]]:
+    """Whole file as a list; prefer iter_csv for anything large"""
+    return list(iter_csv(filename))
+
+
+class CsvBatchWriter:
+    """Long-lived appender: one open file and one DictWriter for many rows.
+
+    Rows are buffered and written ``batch_size`` at a time. ``flush_policy``
+    decides when buffered data is handed to the OS and ``fsync_policy``
+    when it is forced to disk; ``flush()`` and ``close()`` always write
+    everything out. The header is written only when the file is new.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        fieldnames: Sequence[str],
+        batch_size: int = 500,
+        flush_policy: str = FLUSH_BATCH,
+        fsync_policy: str = FSYNC_NEVER,
+    ) -> None:
+        self.path = DATA_DIR / filename
+        self.fieldnames = list(fieldnames)
+        self.batch_size = max(1, batch_size)
+        self.flush_policy = flush_policy
+        self.fsync_policy = fsync_policy
+        self._buffer: List[Dict[str, Any]] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = self.path.open("a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        if is_new:
+            self._writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if self.flush_policy == FLUSH_ROW:
+            self.flush()
+        elif len(self._buffer) >= self.batch_size:
+            self._write_buffer()
+            if self.flush_policy == FLUSH_BATCH:
+                self.flush()
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def _write_buffer(self) -> None:
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer.clear()
+
+    def flush(self) -> None:
+        self._write_buffer()
+        self._file.flush()
+        if self.fsync_policy == FSYNC_BATCH:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._write_buffer()
+        self._file.flush()
+        if self.fsync_policy != FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self) -> "CsvBatchWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# append_csv keeps one writer per (file, columns) open for the process
+_append_writers: Dict[Tuple[str, Tuple[str, ...]], CsvBatchWriter] = {}
 
 
 def append_csv(filename: str, row: Dict[str, str]) -> None:
+    key = (filename, tuple(row.keys()))
+    writer = _append_writers.get(key)
+    if writer is None:
+        writer = _append_writers[key] = CsvBatchWriter(filename, row.keys(), flush_policy=FLUSH_ROW)
+    writer.write(row)
+
+
+@atexit.register
+def close_append_writers() -> None:
+    for writer in _append_writers.values():
+        writer.close()
+    _append_writers.clear()
+
+
+def count_rows(filename: str) -> int:
+    """Data rows in a file (header excluded), counted over a memory map.
+
+    Assumes one record per line, i.e. no quoted newlines.
+    """
+    path = DATA_DIR / filename
+    if not path.exists() or path.stat().st_size == 0:
+        return 0
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # bytes.count per chunk runs in C and keeps memory at one chunk
+        lines = sum(mm[i:i + READ_CHUNK_SIZE].count(b"\n") for i in range(0, len(mm), READ_CHUNK_SIZE))
+        if mm[-1:] != b"\n":
+            lines += 1
+    return max(0, lines - 1)
+
+
+def scan_csv(filename: str, contains: str) -> Iterator[Dict[str, str]]:
+    """Rows whose line contains ``contains``, found with a memory-mapped search.
+
+    Only matching lines are decoded and parsed, so scanning a large file for
+    a rare value touches little more than the page cache. Like count_rows,
+    this assumes one record per line; callers still check the parsed field.
+    """
     path = DATA_DIR / filename
-    exists = path.exists()
-    with path.open("a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=row.keys())
-        if not exists:
-            writer.writeheader()
-        writer.writerow(row)
+    if not path.exists() or path.stat().st_size == 0 or not contains:
+        return
+    needle = contains.encode("utf-8")
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b"\n")
+        if header_end == -1:
+            return
+        header = next(csv.reader([mm[:header_end].decode("utf-8-sig")]))
+        position = mm.find(needle, header_end + 1)
+        while position != -1:
+            line_start = mm.rfind(b"\n", 0, position) + 1
+            line_end = mm.find(b"\n", position)
+            if line_end == -1:
+                line_end = len(mm)
+            fields = next(csv.reader([mm[line_start:line_end].decode("utf-8")]), [])
+            yield dict(zip(header, fields))
+            position = mm.find(needle, line_end + 1)
+
+
+class RecordTooLarge(ValueError):
+    """A record grew past ``max_record_size`` without its quoted field closing"""
+
+
+# Scanner states, as in the csv module: a quote only opens a quoted field
+# at the start of a field, and "" inside one is an escaped quote
+_FIELD_START, _IN_FIELD, _IN_QUOTED, _QUOTE_IN_QUOTED = range(4)
+
+
+class RecordAssembler:
+    """Joins physical lines into whole CSV records for incremental parsing.
+
+    A quoted field may contain newlines, so lines are scanned with the same
+    rules ``csv.reader`` applies (default dialect) to tell whether a quoted
+    field is still open; a stray quote inside an unquoted field is literal
+    and does not join the following lines. Feed lines (with their line
+    endings) one at a time. A record that stays open past
+    ``max_record_size`` characters raises ``RecordTooLarge`` once; the rest
+    of it is then scanned and discarded without being kept, so the next
+    record starts where its quoted field finally closes.
+    """
+
+    def __init__(self, max_record_size: int = MAX_RECORD_SIZE) -> None:
+        self.max_record_size = max_record_size
+        self._parts: List[str] = []
+        self._size = 0
+        self._state = _FIELD_START
+        self._discarding = False
+
+    def _scan(self, line: str) -> None:
+        state = self._state
+        if state != _IN_QUOTED and '"' not in line:
+            self._state = _FIELD_START
+            return
+        for char in line:
+            if state == _IN_QUOTED:
+                if char == '"':
+                    state = _QUOTE_IN_QUOTED
+            elif char == '"':
+                state = _IN_QUOTED if state in (_FIELD_START, _QUOTE_IN_QUOTED) else _IN_FIELD
+            elif char in ",\r\n":
+                state = _FIELD_START
+            else:
+                state = _IN_FIELD
+        self._state = state
+
+    def feed(self, line: str) -> Optional[str]:
+        """The completed record, or None while a quoted field is still open"""
+        self._scan(line)
+        if self._discarding:
+            if self._state != _IN_QUOTED:
+                self._reset()
+            return None
+        self._parts.append(line)
+        self._size += len(line)
+        if self._state == _IN_QUOTED:
+            if self._size > self.max_record_size:
+                self._parts = []
+                self._size = 0
+                self._discarding = True
+                raise RecordTooLarge(f"CSV record longer than {self.max_record_size} characters")
+            return None
+        record = "".join(self._parts)
+        self._reset()
+        return record
 
+    def flush(self) -> Optional[str]:
+        """Whatever is left at end of input (an unterminated record)"""
+        if not self._parts:
+            self._reset()
+            return None
+        record = "".join(self._parts)
+        self._reset()
+        return record
 
+    def _reset(self) -> None:
+        self._parts = []
+        self._size = 0
+        self._state = _FIELD_START
+        self._discarding = False
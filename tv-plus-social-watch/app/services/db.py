@@ -1,12 +1,15 @@
 import os
+import time
 import asyncio
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Dict, Optional
 
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from app.core.config import settings
+from app.core.metrics import Histogram
 
 # Fix Windows event loop issue
 if os.name == 'nt':  # Windows
@@ -38,11 +41,87 @@ def _get_conn_kwargs() -> dict:
     return _build_conn_kwargs()
 
 
+_pool: Optional[AsyncConnectionPool] = None
+_acquire_times = Histogram()
+
+
+async def open_pool() -> AsyncConnectionPool:
+    """Open the shared connection pool; called once from the app lifespan"""
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    conn_kw = _get_conn_kwargs()
+    conninfo = conn_kw.pop("conninfo", "")
+    pool = AsyncConnectionPool(
+        conninfo,
+        kwargs=conn_kw,
+        min_size=settings.db_pool_min_size,
+        max_size=max(settings.db_pool_max_size, settings.db_pool_min_size),
+        timeout=settings.db_pool_timeout,
+        max_lifetime=settings.db_pool_max_lifetime,
+        max_idle=settings.db_pool_max_idle,
+        check=AsyncConnectionPool.check_connection if settings.db_pool_check else None,
+        name="tv-plus-db",
+        open=False,
+    )
+    try:
+        await pool.open(wait=True, timeout=settings.db_pool_timeout)
+    except Exception:
+        await pool.close()
+        raise
+    _pool = pool
+    return pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+def pool_stats() -> Dict:
+    """Pool occupancy and checkout latency, for sizing min/max"""
+    if _pool is None:
+        return {"enabled": False}
+    raw = _pool.get_stats()
+    size = raw.get("pool_size", 0)
+    available = raw.get("pool_available", 0)
+    return {
+        "enabled": True,
+        "min_size": raw.get("pool_min", 0),
+        "max_size": raw.get("pool_max", 0),
+        "size": size,
+        "available": available,
+        "in_use": size - available,
+        "waiting": raw.get("requests_waiting", 0),
+        "requests": raw.get("requests_num", 0),
+        "timeouts": raw.get("requests_errors", 0),
+        "connections_lost": raw.get("connections_lost", 0),
+        "acquire_time": _acquire_times.snapshot(),
+    }
+
+
 @asynccontextmanager
 async def get_connection() -> AsyncIterator[psycopg.AsyncConnection]:
-    conn_kw = _get_conn_kwargs()
-    async with await psycopg.AsyncConnection.connect(**conn_kw) as conn:
-        yield conn
+    if _pool is None:
+        # No pool (scripts, or the pool failed to open): connect directly
+        conn_kw = _get_conn_kwargs()
+        async with await psycopg.AsyncConnection.connect(**conn_kw) as conn:
+            yield conn
+        return
+
+    pool = _pool
+    started = time.perf_counter()
+    conn = await pool.getconn()
+    _acquire_times.observe(time.perf_counter() - started)
+    try:
+        # Commit on success, roll back on error, same as a direct connection
+        async with conn:
+            yield conn
+    finally:
+        await pool.putconn(conn)
 
 
 @asynccontextmanager
@@ -0,0 +1,109 @@
+"""Streaming exports of room history.
+
+Rows come from a named (server-side) cursor in fixed-size batches and are
+encoded batch by batch, so memory stays constant however long the history
+is. The generators only fetch the next batch when the response asks for
+more bytes, which gives backpressure from a slow client down to Postgres.
+
+Each export holds its own connection, outside the shared pool, so slow
+downloads cannot starve the REST routes. At most ``max_concurrent`` run at
+once (the rest wait for a slot), and the session timeouts end a snapshot
+whose client stopped reading, so it cannot hold back vacuum indefinitely.
+"""
+import csv
+import io
+import json
+import uuid
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+import psycopg
+
+from app.core.config import settings
+from .db import _get_conn_kwargs
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = {CSV: "text/csv; charset=utf-8", NDJSON: "application/x-ndjson"}
+
+# name -> (query, columns); every query takes the room id as its only parameter
+EXPORTS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "chat": (
+        "SELECT id, user_id, message, created_at FROM chat WHERE room_id = %s ORDER BY created_at, id",
+        ("id", "user_id", "message", "created_at"),
+    ),
+    "emojis": (
+        "SELECT id, user_id, emoji, created_at FROM emojis WHERE room_id = %s ORDER BY created_at, id",
+        ("id", "user_id", "emoji", "created_at"),
+    ),
+    "expenses": (
+        "SELECT expense_id, user_id, amount, note, weight FROM expenses WHERE room_id = %s ORDER BY expense_id",
+        ("expense_id", "user_id", "amount", "note", "weight"),
+    ),
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+_slots = asyncio.Semaphore(max(1, settings.export_max_concurrent))
+
+
+def _timeout_ms(seconds: float) -> str:
+    return f"{int(seconds * 1000)}ms"
+
+
+async def _batches(query: str, params: Sequence[Any], batch_size: int) -> AsyncIterator[List[tuple]]:
+    async with _slots:
+        async with await psycopg.AsyncConnection.connect(**_get_conn_kwargs()) as conn:
+            # Local to the export's transaction; a FETCH is one statement
+            await conn.execute(
+                "SELECT set_config('statement_timeout', %s, true),"
+                " set_config('idle_in_transaction_session_timeout', %s, true)",
+                (_timeout_ms(settings.export_statement_timeout), _timeout_ms(settings.export_idle_timeout))
+            )
+            # Named cursor: rows stay on the server until fetched
+            async with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cur:
+                await cur.execute(query, params)
+                while True:
+                    rows = await cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+
+
+async def _encode_csv(batches: AsyncIterator[List[tuple]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # Header goes out before the first fetch so the download starts at once
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _encode_ndjson(batches: AsyncIterator[List[tuple]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps({column: _plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def export_stream(name: str, room_id: str, fmt: str, batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """Encoded chunks of one export, ready for a StreamingResponse"""
+    query, columns = EXPORTS[name]
+    batches = _batches(query, (room_id,), max(1, batch_size))
+    if fmt == CSV:
+        return _encode_csv(batches, columns)
+    return _encode_ndjson(batches, columns)
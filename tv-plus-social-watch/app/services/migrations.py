@@ -0,0 +1,81 @@
+"""Versioned schema migrations.
+
+Each ``migrations/NNNN_name.sql`` file runs once, in version order, inside
+its own transaction, and is recorded in ``schema_migrations``. A session
+advisory lock serializes runners, so several workers starting together
+apply each migration exactly once while the others wait.
+
+The app runs them on startup (``DB_MIGRATE_ON_STARTUP``); from a shell use
+``python apply_schema_simple.py`` (``--list`` shows status only).
+"""
+import re
+import logging
+from pathlib import Path
+from typing import List, Set, Tuple
+
+import psycopg
+
+from .db import _get_conn_kwargs
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+# Arbitrary app-wide key for pg_advisory_lock
+LOCK_KEY = 7_473_000_014
+
+_FILE_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def discover() -> List[Tuple[str, str, Path]]:
+    """(version, name, path) for every migration file, oldest first"""
+    found = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        match = _FILE_RE.match(path.name)
+        if match:
+            found.append((match.group(1), match.group(2), path))
+    return sorted(found, key=lambda item: int(item[0]))
+
+
+async def _applied(conn: psycopg.AsyncConnection) -> Set[str]:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version varchar PRIMARY KEY,
+            name varchar,
+            applied_at timestamp DEFAULT now()
+        )
+        """
+    )
+    cur = await conn.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in await cur.fetchall()}
+
+
+async def run_migrations() -> List[str]:
+    """Apply pending migrations; returns the versions applied by this call"""
+    applied_now: List[str] = []
+    async with await psycopg.AsyncConnection.connect(**_get_conn_kwargs(), autocommit=True) as conn:
+        await conn.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            # Read after taking the lock: another worker may have just finished
+            applied = await _applied(conn)
+            for version, name, path in discover():
+                if version in applied:
+                    continue
+                async with conn.transaction():
+                    await conn.execute(path.read_text(encoding="utf-8"))
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name)
+                    )
+                logger.info("Applied migration %s_%s", version, name)
+                applied_now.append(version)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+    return applied_now
+
+
+async def migration_status() -> List[Tuple[str, str, bool]]:
+    async with await psycopg.AsyncConnection.connect(**_get_conn_kwargs(), autocommit=True) as conn:
+        applied = await _applied(conn)
+    return [(version, name, version in applied) for version, name, _ in discover()]
+
@@ -1,5 +1,10 @@
 from typing import List, Dict
+from app.core.config import settings
 from .db import get_cursor
+from .cache import register_cache
+
+# Materialized summaries; vote and room writes invalidate them
+summary_cache = register_cache("room_summary", settings.summary_cache_size, settings.cache_ttl)
 
 
 async def list_rooms() -> List[Dict[str, str]]:
@@ -25,6 +30,7 @@ async def create_room(room_id: str, title: str, start_time_utc: str, host_user_i
             (room_id, title, start_time_utc, host_user_id)
         )
         await cur.connection.commit()
+    invalidate_summary(room_id)
     
     return {
         "id": room_id,
@@ -34,65 +40,62 @@ async def create_room(room_id: str, title: str, start_time_utc: str, host_user_i
     }
 
 
+def invalidate_summary(room_id: str) -> None:
+    summary_cache.invalidate(room_id)
+
+
 async def get_room_summary(room_id: str) -> Dict:
-    """Get room summary with selected content and vote tallies"""
+    """Get room summary with selected content and vote tallies.
+
+    Served from ``summary_cache``; a miss builds it in one statement that
+    aggregates the room's votes once for both the winner and the tally.
+    """
+    summary = await summary_cache.get_or_load(room_id, lambda: _load_room_summary(room_id))
+    # Callers add per-request fields, so never hand out the cached dict
+    return dict(summary)
+
+
+async def _load_room_summary(room_id: str) -> Dict:
     async with get_cursor() as cur:
-        # Get room info
-        await cur.execute(
-            "SELECT room_id, title, start_at, host_id FROM rooms WHERE room_id = %s",
-            (room_id,)
-        )
-        room_row = await cur.fetchone()
-        
-        if not room_row:
-            return {"error": "Room not found"}
-        
-        # Get winning content
         await cur.execute(
             """
-            SELECT v.content_id, cat.title, cat.type, cat.duration_min, COUNT(*) as vote_count
-            FROM votes v
-            JOIN catalog cat ON v.content_id = cat.content_id
-            WHERE v.room_id = %s
-            GROUP BY v.content_id, cat.title, cat.type, cat.duration_min
-            ORDER BY vote_count DESC
-            LIMIT 1
+            WITH tally AS (
+                SELECT content_id, COUNT(*) AS vote_count
+                FROM votes
+                WHERE room_id = %(room_id)s
+                GROUP BY content_id
+            )
+            SELECT r.room_id, r.title, r.start_at, r.host_id,
+                   (
+                       SELECT json_build_object(
+                           'content_id', t.content_id, 'title', cat.title,
+                           'type', cat.type, 'duration_min', cat.duration_min
+                       )
+                       FROM tally t
+                       JOIN catalog cat ON t.content_id = cat.content_id
+                       ORDER BY t.vote_count DESC, t.content_id
+                       LIMIT 1
+                   ) AS selected_content,
+                   COALESCE((SELECT json_object_agg(content_id, vote_count) FROM tally), '{}'::json) AS votes
+            FROM rooms r
+            WHERE r.room_id = %(room_id)s
             """,
-            (room_id,)
+            {"room_id": room_id}
         )
-        winner_row = await cur.fetchone()
-        
-        # Get all vote tallies
-        await cur.execute(
-            """
-            SELECT content_id, COUNT(*) as vote_count
-            FROM votes
-            WHERE room_id = %s
-            GROUP BY content_id
-            """,
-            (room_id,)
-        )
-        vote_rows = await cur.fetchall()
-        
-        votes_dict = {row["content_id"]: int(row["vote_count"]) for row in vote_rows}
-        
-        selected_content = None
-        if winner_row:
-            selected_content = {
-                "content_id": winner_row["content_id"],
-                "title": winner_row["title"],
-                "type": winner_row["type"],
-                "duration_min": int(winner_row["duration_min"])
-            }
-        
-        return {
-            "room_id": room_row["room_id"],
-            "title": room_row["title"],
-            "start_at": str(room_row["start_at"]),
-            "host_id": room_row["host_id"],
-            "selected_content": selected_content,
-            "votes": votes_dict
-        }
+        row = await cur.fetchone()
 
+    if not row:
+        return {"error": "Room not found"}
 
+    selected_content = row["selected_content"]
+    if selected_content:
+        selected_content["duration_min"] = int(selected_content["duration_min"])
 
+    return {
+        "room_id": row["room_id"],
+        "title": row["title"],
+        "start_at": str(row["start_at"]),
+        "host_id": row["host_id"],
+        "selected_content": selected_content,
+        "votes": {content_id: int(count) for content_id, count in row["votes"].items()}
+    }
@@ -0,0 +1,137 @@
+"""Demo data seeding.
+
+``seed`` writes the demo users, catalog, room and candidates with one bulk
+statement per table and records a fingerprint of the data in
+``seed_state``; when the stored fingerprint matches, it does nothing. It
+runs in the background at startup when ``SEED_ON_STARTUP`` is set, and
+from ``add_mock_data.py``.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+
+from .db import get_cursor
+from .cache import caches
+from .versions import versions, CANDIDATES
+
+logger = logging.getLogger(__name__)
+
+SEED_NAME = "demo"
+# Serializes workers seeding at the same time
+LOCK_KEY = 7_473_000_017
+
+USERS = [
+    ("user_1", "Ali", "👨"),
+    ("user_2", "Ayşe", "👩"),
+    ("user_3", "Mehmet", "🧑"),
+    ("host_1", "Moderatör", "👑"),
+]
+
+CATALOG = [
+    ("interstellar", "Yıldızlararası", "movie", 169, "bilim-kurgu,dram,macera"),
+    ("fight_club", "Fight Club", "movie", 139, "dram,gerilim,aksiyon"),
+    ("star_wars", "Star Wars", "movie", 121, "bilim-kurgu,macera,fantazi"),
+    ("film_1", "Aksiyon Filmi", "film", 120, "aksiyon,gerilim"),
+    ("film_2", "Komedi Filmi", "film", 90, "komedi,aile"),
+    ("series_1", "Drama Dizisi", "series", 45, "drama,romantik"),
+    ("documentary_1", "Doğa Belgeseli", "documentary", 60, "doğa,belgesel"),
+]
+
+# (room_id, title, host_id); start time is set to one hour after seeding
+ROOMS = [
+    ("room_1", "Akşam Film Gecesi", "host_1"),
+]
+
+CANDIDATES_SEED = [
+    ("room_1", "interstellar"),
+    ("room_1", "fight_club"),
+    ("room_1", "star_wars"),
+]
+
+
+def fingerprint() -> str:
+    data = json.dumps([USERS, CATALOG, ROOMS, CANDIDATES_SEED], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+
+async def seed(force: bool = False) -> bool:
+    """Write the demo data unless it is already there; returns True if it wrote"""
+    current = fingerprint()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_KEY,))
+        await cur.execute("SELECT fingerprint FROM seed_state WHERE name = %s", (SEED_NAME,))
+        row = await cur.fetchone()
+        if row and row["fingerprint"] == current and not force:
+            await cur.connection.commit()
+            return False
+
+        await cur.execute(
+            """
+            INSERT INTO users (user_id, name, avatar)
+            SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[])
+            ON CONFLICT (user_id) DO NOTHING
+            """,
+            _columns(USERS)
+        )
+        await cur.execute(
+            """
+            INSERT INTO catalog (content_id, title, type, duration_min, tags)
+            SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[], %s::int4[], %s::text[])
+            ON CONFLICT (content_id) DO NOTHING
+            """,
+            _columns(CATALOG)
+        )
+        room_ids, titles, hosts = _columns(ROOMS)
+        start_at = datetime.now() + timedelta(hours=1)
+        await cur.execute(
+            """
+            INSERT INTO rooms (room_id, title, start_at, host_id)
+            SELECT room_id, title, %s, host_id
+            FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[]) AS r(room_id, title, host_id)
+            ON CONFLICT (room_id) DO UPDATE SET title = EXCLUDED.title, start_at = EXCLUDED.start_at
+            """,
+            (start_at, room_ids, titles, hosts)
+        )
+        await cur.execute(
+            """
+            INSERT INTO candidates (room_id, content_id)
+            SELECT * FROM unnest(%s::varchar[], %s::varchar[])
+            ON CONFLICT DO NOTHING
+            """,
+            _columns(CANDIDATES_SEED)
+        )
+        await cur.execute(
+            """
+            INSERT INTO seed_state (name, fingerprint) VALUES (%s, %s)
+            ON CONFLICT (name) DO UPDATE SET fingerprint = EXCLUDED.fingerprint, applied_at = now()
+            """,
+            (SEED_NAME, current)
+        )
+        await cur.connection.commit()
+
+    # Anything cached before the seed landed is stale now
+    for cache in caches.values():
+        cache.clear()
+    for room_id, _, _ in ROOMS:
+        versions.bump(room_id, CANDIDATES)
+    return True
+
+
+async def _seed_in_background() -> None:
+    try:
+        if await seed():
+            logger.info("Demo data seeded")
+        else:
+            logger.info("Demo data already up to date")
+    except Exception:
+        logger.exception("Demo data seeding failed")
+
+
+def start_background_seed() -> asyncio.Task:
+    return asyncio.create_task(_seed_in_background())
@@ -1,6 +1,8 @@
 from typing import List, Dict
-from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+import heapq
 from .db import get_cursor
+from .versions import versions, EXPENSES
 
 
 async def list_expenses(room_id: str) -> List[Dict[str, str]]:
@@ -23,13 +25,33 @@ async def list_expenses(room_id: str) -> List[Dict[str, str]]:
         ]
 
 
-async def add_expense(expense_id: str, room_id: str, user_id: str, amount: float, description: str, weight: float) -> Dict[str, str]:
+CENT = Decimal("0.01")
+
+
+def _money(value: Decimal) -> str:
+    return str(value.quantize(CENT, rounding=ROUND_HALF_UP))
+
+
+async def add_expense(expense_id: str, room_id: str, user_id: str, amount: Decimal, description: str, weight: Decimal) -> Dict[str, str]:
     async with get_cursor() as cur:
         await cur.execute(
             "INSERT INTO expenses (expense_id, room_id, user_id, amount, note, weight) VALUES (%s, %s, %s, %s, %s, %s)",
             (expense_id, room_id, user_id, amount, description, weight)
         )
+        # Same transaction, so the ledger never disagrees with the expenses
+        await cur.execute(
+            """
+            INSERT INTO expense_ledger (room_id, user_id, paid, weight, expense_count)
+            VALUES (%s, %s, %s, %s, 1)
+            ON CONFLICT (room_id, user_id) DO UPDATE SET
+                paid = expense_ledger.paid + EXCLUDED.paid,
+                weight = expense_ledger.weight + EXCLUDED.weight,
+                expense_count = expense_ledger.expense_count + 1
+            """,
+            (room_id, user_id, amount, weight)
+        )
         await cur.connection.commit()
+    versions.bump(room_id, EXPENSES)
     
     return {
         "expense_id": expense_id,
@@ -52,10 +74,13 @@ async def calc_balances(room_id: str) -> List[Dict[str, str]]:
     Total = 180, Total weight = 1.5
     U2 owes: 180 * (1.0/1.5) = 120
     U3 owes: 180 * (0.5/1.5) = 60
+    
+    Reads one ``expense_ledger`` row per member, not every expense, and
+    computes in Decimal; amounts are rounded to cents only for output.
     """
     async with get_cursor() as cur:
         await cur.execute(
-            "SELECT user_id, amount, weight FROM expenses WHERE room_id = %s",
+            "SELECT user_id, paid, weight FROM expense_ledger WHERE room_id = %s ORDER BY user_id",
             (room_id,)
         )
         rows = await cur.fetchall()
@@ -63,48 +88,83 @@ async def calc_balances(room_id: str) -> List[Dict[str, str]]:
     if not rows:
         return []
     
-    # Calculate total amount and collect weights per user
-    paid_by_user = defaultdict(float)
-    weight_by_user = defaultdict(float)
-    total_amount = 0.0
-    
-    for row in rows:
-        user_id = row["user_id"]
-        amount = float(row["amount"])
-        weight = float(row["weight"])
-        
-        paid_by_user[user_id] += amount
-        weight_by_user[user_id] += weight
-        total_amount += amount
-    
+    total_amount = sum((row["paid"] for row in rows), Decimal(0))
     # Calculate total weight (Σweight)
-    total_weight = sum(weight_by_user.values())
+    total_weight = sum((row["weight"] for row in rows), Decimal(0))
     if total_weight == 0:
-        total_weight = 1.0
+        total_weight = Decimal(1)
     
-    # Calculate each user's balance
-    # Formula: share_i = total * (weight_i / Σweight)
     balances = []
-    all_users = set(paid_by_user.keys()) | set(weight_by_user.keys())
-    
-    for user_id in all_users:
-        paid = paid_by_user.get(user_id, 0.0)
-        weight = weight_by_user.get(user_id, 0.0)
-        
+    for row in rows:
+        paid = row["paid"]
         # Calculate what this user owes based on their weight
-        owed = total_amount * (weight / total_weight)
-        
+        owed = total_amount * row["weight"] / total_weight
         # Net balance = what they paid - what they owe
         net = paid - owed
         
         balances.append({
-            "user_id": user_id, 
-            "paid": f"{paid:.2f}", 
-            "owed": f"{owed:.2f}", 
-            "net": f"{net:.2f}"
+            "user_id": row["user_id"],
+            "paid": _money(paid),
+            "owed": _money(owed),
+            "net": _money(net)
         })
     
     return balances
 
 
+def _to_cents(nets: Dict[str, Decimal]) -> Dict[str, int]:
+    """Round nets to whole cents so that they still sum to exactly zero.
+
+    Each net is rounded half-up; the few cents of drift this leaves are
+    handed one at a time to the largest positions, so rounding never
+    creates or loses money in the plan.
+    """
+    cents = {user_id: int((net * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)) for user_id, net in nets.items()}
+    drift = -sum(cents.values())
+    if drift:
+        step = 1 if drift > 0 else -1
+        largest = sorted(cents, key=lambda user_id: (-abs(nets[user_id]), user_id))
+        for i in range(abs(drift)):
+            cents[largest[i % len(largest)]] += step
+    return cents
+
+
+def settle(nets: Dict[str, Decimal]) -> List[Dict[str, str]]:
+    """Turn net positions into a short list of transfers.
+
+    Greedy on two heaps: the largest debtor pays the largest creditor as
+    much as they can, and whoever still has a balance goes back on its
+    heap. Every step settles at least one member, so there are at most
+    n - 1 transfers, found in O(n log n).
+    """
+    creditors = []
+    debtors = []
+    for user_id, amount in _to_cents(nets).items():
+        if amount > 0:
+            creditors.append((-amount, user_id))
+        elif amount < 0:
+            debtors.append((amount, user_id))
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append({
+            "from": debtor,
+            "to": creditor,
+            "amount": _money(Decimal(amount) / 100)
+        })
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
 
+async def settlement_plan(room_id: str) -> List[Dict[str, str]]:
+    """Who pays whom to settle the room's balances"""
+    balances = await calc_balances(room_id)
+    return settle({b["user_id"]: Decimal(b["net"]) for b in balances})
@@ -0,0 +1,80 @@
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from app.core.config import settings
+
+# Resources whose reads are versioned per room
+VOTES = "votes"
+CANDIDATES = "candidates"
+EXPENSES = "expenses"
+CHAT = "chat"
+
+# Room id meaning "every room", for writes that touch shared data (catalog)
+ALL_ROOMS = "*"
+
+
+class ResourceVersions:
+    """Per-room, per-resource write counters used to build ETags.
+
+    Writers call ``bump``; readers turn the current counter into a strong
+    ETag. The process-wide ``epoch`` is part of every tag, so a restart or
+    a different worker never answers 304 for a tag it did not issue.
+    Listeners added with ``on_bump`` relay bumps to the other workers,
+    which apply them with ``propagate=False``. Bumping ``ALL_ROOMS``
+    invalidates the resource's tags in every room at once.
+
+    Counters are kept for at most ``max_entries`` (room, resource) pairs,
+    least recently used first out. Versions come from one increasing
+    sequence, and a pair that is not tracked reports the highest version
+    evicted so far, so an evicted room's version never goes back to a
+    value an old tag could match; at worst a client misses one 304.
+    """
+
+    def __init__(self, max_entries: int = 100000) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+        self.max_entries = max(1, max_entries)
+        self._versions: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._sequence = 0
+        self._evicted_floor = 0
+        self._generations: Dict[str, int] = {}
+        self._listeners: List[Callable[[str, str], None]] = []
+
+    def current(self, room_id: str, resource: str) -> int:
+        key = (room_id, resource)
+        version = self._versions.get(key)
+        if version is None:
+            return self._evicted_floor
+        self._versions.move_to_end(key)
+        return version
+
+    def bump(self, room_id: str, resource: str, propagate: bool = True) -> int:
+        if room_id == ALL_ROOMS:
+            version = self._generations[resource] = self._generations.get(resource, 0) + 1
+        else:
+            key = (room_id, resource)
+            self._sequence += 1
+            version = self._versions[key] = self._sequence
+            self._versions.move_to_end(key)
+            while len(self._versions) > self.max_entries:
+                _, evicted = self._versions.popitem(last=False)
+                self._evicted_floor = max(self._evicted_floor, evicted)
+        if propagate:
+            for listener in self._listeners:
+                listener(room_id, resource)
+        return version
+
+    def on_bump(self, listener: Callable[[str, str], None]) -> None:
+        self._listeners.append(listener)
+
+    def etag(self, room_id: str, resource: str, variant: str = "") -> str:
+        tag = f"{self.epoch}-{resource}-{self.current(room_id, resource)}"
+        generation = self._generations.get(resource)
+        if generation:
+            tag = f"{tag}-g{generation}"
+        if variant:
+            tag = f"{tag}-{variant}"
+        return f'"{tag}"'
+
+
+versions = ResourceVersions(max_entries=settings.etag_versions_size)
@@ -1,109 +1,383 @@
 from typing import Dict, List, Tuple, Optional
 from collections import Counter
+import time
+import asyncio
+import logging
+
+from app.core.config import settings
 from .db import get_cursor
+from .versions import versions, VOTES, CANDIDATES
+from .cache import register_cache
+from .room_service import invalidate_summary
+
+logger = logging.getLogger(__name__)
+
+
+class RoomTally:
+    """Votes of one room kept in memory: who voted for what, and the counts.
+
+    ``decided`` holds the winner once everyone has voted, so later polls of
+    a decided room return it as is; any vote change clears it.
+    """
+
+    __slots__ = ("votes_by_user", "counts", "last_access", "decided")
+
+    def __init__(self, votes_by_user: Dict[str, str]) -> None:
+        self.votes_by_user = dict(votes_by_user)
+        self.counts = Counter(self.votes_by_user.values())
+        self.last_access = time.monotonic()
+        self.decided: Optional[Dict[str, str]] = None
+
+    @property
+    def total_voted(self) -> int:
+        return len(self.votes_by_user)
+
+    def apply(self, user_id: str, content_id: str) -> bool:
+        """Record (or move) a user's vote; returns False if nothing changed"""
+        previous = self.votes_by_user.get(user_id)
+        if previous == content_id:
+            return False
+        if previous is not None:
+            self.counts[previous] -= 1
+            if self.counts[previous] <= 0:
+                del self.counts[previous]
+        self.votes_by_user[user_id] = content_id
+        self.counts[content_id] += 1
+        self.decided = None
+        return True
+
+    def ranked(self) -> List[Tuple[str, int]]:
+        """Most votes first; ties go to the smaller content_id"""
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+class VoteTallies:
+    """Per-room tallies loaded from ``votes`` on first access.
+
+    ``record_vote`` updates them in place, and votes seen on other workers
+    are applied through ``apply_vote``. A background task reloads the
+    cached rooms from the database every ``reconcile_interval`` seconds
+    and forgets rooms nobody has read for ``idle_ttl`` seconds. Votes
+    applied while a load is running are replayed on top of its result, so
+    a reload never rolls back a vote its query did not see. ``invalidate``
+    drops a room (bulk writes elsewhere) and discards loads in flight for it.
+    """
+
+    def __init__(self, reconcile_interval: float = 30.0, idle_ttl: float = 600.0) -> None:
+        self.reconcile_interval = reconcile_interval
+        self.idle_ttl = idle_ttl
+        self._rooms: Dict[str, RoomTally] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        # One {room_id: [(user_id, content_id), ...]} per load in flight; None = discard
+        self._inflight: List[Dict[str, Optional[List[Tuple[str, str]]]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self, room_id: str) -> RoomTally:
+        tally = self._rooms.get(room_id)
+        while tally is None:
+            # Concurrent first reads share one load; go again if it was invalidated
+            task = self._loading.get(room_id)
+            if task is None:
+                task = self._loading[room_id] = asyncio.ensure_future(self._load([room_id]))
+            try:
+                await asyncio.shield(task)
+            finally:
+                self._loading.pop(room_id, None)
+            tally = self._rooms.get(room_id)
+        tally.last_access = time.monotonic()
+        return tally
+
+    def apply_vote(self, room_id: str, user_id: str, content_id: str) -> bool:
+        for pending in self._inflight:
+            votes = pending.get(room_id)
+            if votes is not None:
+                votes.append((user_id, content_id))
+        tally = self._rooms.get(room_id)
+        if tally is None:
+            # Not cached here; the next read loads it from the database
+            return False
+        return tally.apply(user_id, content_id)
+
+    def invalidate(self, room_id: str) -> None:
+        """Forget a room's tally; the next read loads it from the database"""
+        self._rooms.pop(room_id, None)
+        for pending in self._inflight:
+            if room_id in pending:
+                pending[room_id] = None
+
+    async def _load(self, room_ids: List[str]) -> None:
+        pending: Dict[str, Optional[List[Tuple[str, str]]]] = {room_id: [] for room_id in room_ids}
+        self._inflight.append(pending)
+        try:
+            async with get_cursor() as cur:
+                await cur.execute(
+                    "SELECT room_id, user_id, content_id FROM votes WHERE room_id = ANY(%s)",
+                    (room_ids,)
+                )
+                rows = await cur.fetchall()
+        finally:
+            self._inflight.remove(pending)
+        by_room: Dict[str, Dict[str, str]] = {room_id: {} for room_id in room_ids}
+        for row in rows:
+            by_room[row["room_id"]][row["user_id"]] = row["content_id"]
+        for room_id, votes in by_room.items():
+            replay = pending[room_id]
+            if replay is None:
+                # Invalidated while the query ran; its result may predate the change
+                continue
+            tally = RoomTally(votes)
+            # Replaying a vote the query already saw is a no-op
+            for user_id, content_id in replay:
+                tally.apply(user_id, content_id)
+            previous = self._rooms.get(room_id)
+            if previous is not None:
+                tally.last_access = previous.last_access
+                if previous.votes_by_user == tally.votes_by_user:
+                    tally.decided = previous.decided
+            self._rooms[room_id] = tally
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            deadline = time.monotonic() - self.idle_ttl
+            for room_id in [r for r, t in self._rooms.items() if t.last_access < deadline]:
+                del self._rooms[room_id]
+            if not self._rooms:
+                continue
+            try:
+                await self._load(list(self._rooms))
+            except Exception:
+                logger.exception("Vote tally reconciliation failed")
+
+
+tallies = VoteTallies(
+    reconcile_interval=settings.vote_reconcile_interval,
+    idle_ttl=settings.vote_tally_idle_ttl,
+)
+
+
+def on_vote_event(room_id: str, message: dict) -> None:
+    """RoomManager hook: apply a ``vote`` announced by any worker, or reload the room's tally"""
+    if message.get("reload"):
+        # Bulk writes name no votes (they would not fit in one NOTIFY)
+        tallies.invalidate(room_id)
+        return
+    votes = message.get("votes") or [message.get("vote") or {}]
+    for vote in votes:
+        if vote.get("user_id") and vote.get("content_id"):
+            tallies.apply_vote(room_id, vote["user_id"], vote["content_id"])
+
+
+catalog_cache = register_cache("catalog", settings.catalog_cache_size, settings.cache_ttl)
+candidates_cache = register_cache("candidates", settings.candidates_cache_size, settings.cache_ttl)
+
+
+def _catalog_entry(row) -> Dict[str, str]:
+    return {
+        "content_id": row["content_id"],
+        "title": row["title"],
+        "type": row["type"],
+        "duration_min": str(row["duration_min"]),
+        "tags": row["tags"]
+    }
+
+
+async def get_catalog_entry(content_id: str) -> Optional[Dict[str, str]]:
+    """Catalog row by id, served from the catalog cache after the first read"""
+    async def load() -> Optional[Dict[str, str]]:
+        async with get_cursor() as cur:
+            await cur.execute(
+                "SELECT content_id, title, type, duration_min, tags FROM catalog WHERE content_id = %s",
+                (content_id,)
+            )
+            row = await cur.fetchone()
+        return _catalog_entry(row) if row else None
+
+    return await catalog_cache.get_or_load(content_id, load)
 
 
 async def list_candidates(room_id: str) -> List[Dict[str, str]]:
-    """Get voting candidates from database only"""
+    """Get voting candidates; cached per room until ``add_candidates`` invalidates it"""
+    async def load() -> List[Dict[str, str]]:
+        async with get_cursor() as cur:
+            await cur.execute(
+                """
+                SELECT c.content_id, cat.title, cat.type, cat.duration_min, cat.tags 
+                FROM candidates c 
+                JOIN catalog cat ON c.content_id = cat.content_id 
+                WHERE c.room_id = %s 
+                ORDER BY cat.title
+                """,
+                (room_id,)
+            )
+            rows = await cur.fetchall()
+        entries = [_catalog_entry(row) for row in rows]
+        # The join already read these catalog rows; keep them for winner lookups
+        for entry in entries:
+            catalog_cache.set(entry["content_id"], entry)
+        return entries
+
+    # Entries are shared with the cache, so hand out a new list
+    return list(await candidates_cache.get_or_load(room_id, load))
+
+
+async def add_candidates(room_id: str, content_ids: List[str]) -> Dict[str, List]:
+    """Add candidates in one statement, validated against ``catalog``.
+
+    Returns the content ids actually inserted, and the skipped ones with a
+    reason: ``exists`` (already a candidate) or ``unknown_content``.
+    """
     async with get_cursor() as cur:
         await cur.execute(
             """
-            SELECT c.content_id, cat.title, cat.type, cat.duration_min, cat.tags 
-            FROM candidates c 
-            JOIN catalog cat ON c.content_id = cat.content_id 
-            WHERE c.room_id = %s 
-            ORDER BY cat.title
+            WITH requested AS (
+                SELECT DISTINCT content_id FROM unnest(%(content_ids)s::varchar[]) AS r(content_id)
+            ), inserted AS (
+                INSERT INTO candidates (room_id, content_id)
+                SELECT %(room_id)s, r.content_id
+                FROM requested r
+                JOIN catalog cat ON cat.content_id = r.content_id
+                ON CONFLICT (room_id, content_id) DO NOTHING
+                RETURNING content_id
+            )
+            SELECT r.content_id,
+                   CASE WHEN i.content_id IS NOT NULL THEN 'inserted'
+                        WHEN cat.content_id IS NULL THEN 'unknown_content'
+                        ELSE 'exists' END AS status
+            FROM requested r
+            LEFT JOIN inserted i ON i.content_id = r.content_id
+            LEFT JOIN catalog cat ON cat.content_id = r.content_id
+            ORDER BY r.content_id
             """,
-            (room_id,)
+            {"room_id": room_id, "content_ids": content_ids}
         )
         rows = await cur.fetchall()
-        return [
-            {
-                "content_id": row["content_id"],
-                "title": row["title"],
-                "type": row["type"],
-                "duration_min": str(row["duration_min"]),
-                "tags": row["tags"]
-            }
-            for row in rows
-        ]
+        await cur.connection.commit()
+
+    inserted = [row["content_id"] for row in rows if row["status"] == "inserted"]
+    skipped = [
+        {"content_id": row["content_id"], "reason": row["status"]}
+        for row in rows if row["status"] != "inserted"
+    ]
+    if inserted:
+        invalidate_candidates(room_id)
+        versions.bump(room_id, CANDIDATES)
+    return {"inserted": inserted, "skipped": skipped}
+
+
+def invalidate_candidates(room_id: str) -> None:
+    candidates_cache.invalidate(room_id)
 
 
 async def record_vote(room_id: str, content_id: str, user_id: str) -> Dict[str, str]:
     async with get_cursor() as cur:
-        # Delete existing vote for this user in this room
-        await cur.execute(
-            "DELETE FROM votes WHERE room_id = %s AND user_id = %s",
-            (room_id, user_id)
-        )
-        # Insert new vote
+        # One vote per user per room (votes_room_user_key); a new vote replaces the old one
         await cur.execute(
-            "INSERT INTO votes (room_id, content_id, user_id) VALUES (%s, %s, %s)",
+            """
+            INSERT INTO votes (room_id, content_id, user_id) VALUES (%s, %s, %s)
+            ON CONFLICT (room_id, user_id) DO UPDATE SET content_id = EXCLUDED.content_id
+            """,
             (room_id, content_id, user_id)
         )
         await cur.connection.commit()
     
+    tallies.apply_vote(room_id, user_id, content_id)
+    invalidate_summary(room_id)
+    versions.bump(room_id, VOTES)
     return {"room_id": room_id, "content_id": content_id, "user_id": user_id}
 
 
-async def tally_votes(room_id: str) -> List[Dict[str, str]]:
+async def record_votes(votes: List[Tuple[str, str, str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Upsert many ``(room_id, content_id, user_id)`` votes in one statement.
+
+    When the batch holds several votes from one user in one room, the last
+    one wins, as if they had been sent one by one. Returns the applied
+    votes grouped by room.
+    """
+    if not votes:
+        return {}
+    room_ids, content_ids, user_ids = (list(column) for column in zip(*votes))
     async with get_cursor() as cur:
+        # DISTINCT ON keeps one row per key: ON CONFLICT cannot touch a row twice
         await cur.execute(
-            "SELECT content_id, COUNT(*) as vote_count "
-            "FROM votes WHERE room_id = %s "
-            "GROUP BY content_id "
-            "ORDER BY vote_count DESC",
-            (room_id,)
+            """
+            INSERT INTO votes (room_id, content_id, user_id)
+            SELECT DISTINCT ON (room_id, user_id) room_id, content_id, user_id
+            FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[])
+                WITH ORDINALITY AS v(room_id, content_id, user_id, ord)
+            ORDER BY room_id, user_id, ord DESC
+            ON CONFLICT (room_id, user_id) DO UPDATE SET content_id = EXCLUDED.content_id
+            """,
+            (room_ids, content_ids, user_ids)
         )
-        rows = await cur.fetchall()
-        return [
-            {"content_id": row["content_id"], "votes": str(row["vote_count"])}
-            for row in rows
-        ]
+        await cur.connection.commit()
+
+    applied: Dict[Tuple[str, str], str] = {}
+    for room_id, content_id, user_id in votes:
+        applied[(room_id, user_id)] = content_id
+    by_room: Dict[str, List[Dict[str, str]]] = {}
+    for (room_id, user_id), content_id in applied.items():
+        tallies.apply_vote(room_id, user_id, content_id)
+        by_room.setdefault(room_id, []).append({"user_id": user_id, "content_id": content_id})
+    for room_id in by_room:
+        invalidate_summary(room_id)
+        versions.bump(room_id, VOTES)
+    return by_room
+
+
+async def tally_votes(room_id: str) -> List[Dict[str, str]]:
+    tally = await tallies.get(room_id)
+    return [
+        {"content_id": content_id, "votes": str(count)}
+        for content_id, count in tally.ranked()
+    ]
 
 
 async def get_winner(room_id: str, room_user_count: int = 0) -> Tuple[Optional[Dict[str, str]], int]:
     """Get the winning content (highest votes) with full details
     Returns: (winner_dict or None, total_voted_count)
     Only returns winner if ALL users in room have voted (when room_user_count >= 2)
+    Ties are broken by content_id (see ``RoomTally.ranked``); once decided, the
+    winner is kept on the tally until a vote changes.
     """
-    async with get_cursor() as cur:
-        # Count total votes in this room
-        await cur.execute(
-            "SELECT COUNT(DISTINCT user_id) as total_voted FROM votes WHERE room_id = %s",
-            (room_id,)
-        )
-        vote_row = await cur.fetchone()
-        total_voted = vote_row["total_voted"] if vote_row else 0
-        
-        # Only return winner if:
-        # 1. Room has at least 2 users
-        # 2. All users have voted
-        if room_user_count < 2 or total_voted < room_user_count:
-            return (None, total_voted)
-        
-        # Get the winning content
-        await cur.execute(
-            "SELECT v.content_id, cat.title, cat.type, cat.duration_min, COUNT(*) as vote_count "
-            "FROM votes v "
-            "JOIN catalog cat ON v.content_id = cat.content_id "
-            "WHERE v.room_id = %s "
-            "GROUP BY v.content_id, cat.title, cat.type, cat.duration_min "
-            "ORDER BY vote_count DESC "
-            "LIMIT 1",
-            (room_id,)
-        )
-        row = await cur.fetchone()
-        if row:
-            winner = {
-                "content_id": row["content_id"],
-                "title": row["title"],
-                "type": row["type"],
-                "duration_min": str(row["duration_min"]),
-                "votes": str(row["vote_count"])
-            }
-            return (winner, total_voted)
+    tally = await tallies.get(room_id)
+    total_voted = tally.total_voted
+    
+    # Only return winner if:
+    # 1. Room has at least 2 users
+    # 2. All users have voted
+    if room_user_count < 2 or total_voted < room_user_count:
         return (None, total_voted)
-
-
-
+    if tally.decided is not None:
+        return (dict(tally.decided), total_voted)
+    
+    ranked = tally.ranked()
+    if not ranked:
+        return (None, total_voted)
+    content_id, vote_count = ranked[0]
+    
+    # Counts come from memory and details from the catalog cache
+    entry = await get_catalog_entry(content_id)
+    if not entry:
+        return (None, total_voted)
+    winner = {
+        "content_id": entry["content_id"],
+        "title": entry["title"],
+        "type": entry["type"],
+        "duration_min": entry["duration_min"],
+        "votes": str(vote_count)
+    }
+    # Skip the freeze if a vote arrived while the catalog lookup was running
+    if tally.counts.get(content_id) == vote_count and tally.ranked()[0][0] == content_id:
+        tally.decided = winner
+    return (dict(winner), total_voted)
@@ -0,0 +1,238 @@
+import abc
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import psycopg
+from psycopg import sql
+
+from app.core.config import settings
+from app.services.db import get_cursor, _get_conn_kwargs
+
+logger = logging.getLogger(__name__)
+
+# deliver(room_id, message, exclude_user) -> sends to this worker's sockets
+DeliverFn = Callable[[str, dict, Optional[str]], Awaitable[None]]
+# local_presence() -> {room_id: {user_id, ...}} for this worker
+PresenceFn = Callable[[], Dict[str, Set[str]]]
+
+
+class FanoutBackend(abc.ABC):
+    """Carries room events and presence between the workers serving a room.
+
+    RoomManager owns the sockets; the backend decides who else has to hear
+    about an event and calls ``deliver`` on every worker that does.
+    """
+
+    async def start(self, deliver: DeliverFn, local_presence: PresenceFn) -> None:
+        self._deliver = deliver
+        self._local_presence = local_presence
+
+    async def stop(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def publish(self, room_id: str, message: dict, exclude_user: Optional[str] = None) -> None:
+        """Deliver a room event to every worker with members in the room"""
+
+    async def presence_changed(self, room_id: str, user_id: str, joined: bool) -> None:
+        pass
+
+    def notify_peers(self, room_id: str, message: dict) -> None:
+        """Send a message to the other workers only (no-op with a single worker)"""
+        pass
+
+    def remote_users(self, room_id: str) -> Set[str]:
+        """Users in the room that are connected to other workers"""
+        return set()
+
+
+class InProcessBackend(FanoutBackend):
+    """Single-worker backend: every member of a room lives in this process"""
+
+    async def publish(self, room_id: str, message: dict, exclude_user: Optional[str] = None) -> None:
+        await self._deliver(room_id, message, exclude_user)
+
+
+class PostgresNotifyBackend(FanoutBackend):
+    """Cross-worker fan-out over Postgres LISTEN/NOTIFY.
+
+    Events are delivered locally right away and NOTIFY'd to the other
+    workers, which ignore their own notifications. Presence is shared as
+    join/leave notices plus a periodic snapshot, so a worker that dies
+    without saying goodbye drops out after ``presence_ttl`` seconds.
+    """
+
+    # NOTIFY payloads are capped at 8000 bytes by Postgres
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, channel: str = "tv_plus_rooms", presence_interval: float = 10.0) -> None:
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.presence_interval = presence_interval
+        self.presence_ttl = presence_interval * 3
+        # room_id -> worker_id -> (users, refreshed_at)
+        self._remote: Dict[str, Dict[str, Tuple[Set[str], float]]] = {}
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._listen_conn: Optional[psycopg.AsyncConnection] = None
+        self._seq = 0
+        self.dropped_oversize = 0
+
+    async def start(self, deliver: DeliverFn, local_presence: PresenceFn) -> None:
+        await super().start(deliver, local_presence)
+        self._tasks = [
+            asyncio.create_task(self._listen_loop()),
+            asyncio.create_task(self._publish_loop()),
+            asyncio.create_task(self._presence_loop()),
+        ]
+        # Ask the other workers for their presence instead of waiting a full interval
+        self._send({"k": "hello"})
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._listen_conn is not None:
+            await self._listen_conn.close()
+            self._listen_conn = None
+
+    async def publish(self, room_id: str, message: dict, exclude_user: Optional[str] = None) -> None:
+        await self._deliver(room_id, message, exclude_user)
+        self._send({"k": "event", "r": room_id, "x": exclude_user, "m": message})
+
+    async def presence_changed(self, room_id: str, user_id: str, joined: bool) -> None:
+        self._send({"k": "join" if joined else "leave", "r": room_id, "u": user_id})
+
+    def notify_peers(self, room_id: str, message: dict) -> None:
+        self._send({"k": "event", "r": room_id, "x": None, "m": message})
+
+    def remote_users(self, room_id: str) -> Set[str]:
+        workers = self._remote.get(room_id)
+        if not workers:
+            return set()
+        deadline = time.monotonic() - self.presence_ttl
+        users: Set[str] = set()
+        for members, refreshed_at in workers.values():
+            if refreshed_at >= deadline:
+                users |= members
+        return users
+
+    def _send(self, envelope: dict) -> None:
+        # The sequence number keeps Postgres from folding identical payloads together
+        self._seq += 1
+        envelope["o"] = self.worker_id
+        envelope["s"] = self._seq
+        payload = json.dumps(envelope, separators=(",", ":"))
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD:
+            self.dropped_oversize += 1
+            logger.warning("Event for room %s too large for NOTIFY, not fanned out", envelope.get("r"))
+            return
+        self._outbox.put_nowait(payload)
+
+    async def _publish_loop(self) -> None:
+        """Drain the outbox, sending everything queued in one round-trip"""
+        while True:
+            payloads = [await self._outbox.get()]
+            while not self._outbox.empty():
+                payloads.append(self._outbox.get_nowait())
+            try:
+                async with get_cursor() as cur:
+                    await cur.execute(
+                        "SELECT pg_notify(%s, p) FROM unnest(%s::text[]) AS p",
+                        (self.channel, payloads)
+                    )
+            except Exception:
+                logger.exception("Failed to publish %d room notifications", len(payloads))
+
+    async def _listen_loop(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                self._listen_conn = await psycopg.AsyncConnection.connect(**_get_conn_kwargs(), autocommit=True)
+                await self._listen_conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                backoff = 1.0
+                async for notify in self._listen_conn.notifies():
+                    await self._on_notify(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("LISTEN connection lost, retrying in %.0fs", backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if self._listen_conn is not None:
+                    await self._listen_conn.close()
+                    self._listen_conn = None
+
+    async def _on_notify(self, payload: str) -> None:
+        try:
+            envelope = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        origin = envelope.get("o")
+        if origin == self.worker_id:
+            return
+
+        kind = envelope.get("k")
+        if kind == "event":
+            await self._deliver(envelope["r"], envelope["m"], envelope.get("x"))
+        elif kind == "join":
+            members, _ = self._remote.setdefault(envelope["r"], {}).get(origin, (set(), 0.0))
+            members.add(envelope["u"])
+            self._remote[envelope["r"]][origin] = (members, time.monotonic())
+        elif kind == "leave":
+            entry = self._remote.get(envelope["r"], {}).get(origin)
+            if entry:
+                entry[0].discard(envelope["u"])
+        elif kind == "snapshot":
+            now = time.monotonic()
+            for room_id, users in envelope["rooms"].items():
+                self._remote.setdefault(room_id, {})[origin] = (set(users), now)
+        elif kind == "hello":
+            self._send_snapshot()
+
+    async def _presence_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.presence_interval)
+            self._send_snapshot()
+            self._expire_presence()
+
+    def _send_snapshot(self) -> None:
+        # Split into chunks that each fit in one NOTIFY payload
+        chunk: Dict[str, List[str]] = {}
+        size = 0
+        for room_id, users in self._local_presence().items():
+            entry_size = len(json.dumps({room_id: sorted(users)}).encode("utf-8"))
+            if chunk and size + entry_size > self.MAX_PAYLOAD - 100:
+                self._send({"k": "snapshot", "rooms": chunk})
+                chunk, size = {}, 0
+            chunk[room_id] = sorted(users)
+            size += entry_size
+        if chunk:
+            self._send({"k": "snapshot", "rooms": chunk})
+
+    def _expire_presence(self) -> None:
+        deadline = time.monotonic() - self.presence_ttl
+        for room_id in list(self._remote):
+            workers = self._remote[room_id]
+            for worker_id in [w for w, (users, seen) in workers.items() if seen < deadline or not users]:
+                del workers[worker_id]
+            if not workers:
+                del self._remote[room_id]
+
+
+def create_backend(name: Optional[str] = None) -> FanoutBackend:
+    name = (name or settings.ws_backend).lower()
+    if name in ("memory", "inprocess", "local"):
+        return InProcessBackend()
+    if name in ("postgres", "pg", "notify"):
+        return PostgresNotifyBackend(
+            channel=settings.ws_notify_channel,
+            presence_interval=settings.ws_presence_interval,
+        )
+    raise ValueError(f"Unknown WebSocket backend: {name}")
@@ -0,0 +1,132 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+from fastapi import WebSocket
+
+from app.core.metrics import Histogram
+from .protocol import Codec, DEFAULT_CODEC, Frame
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+# WebSocket close code 1013: "try again later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """One member's socket with a bounded outbound queue and its own writer.
+
+    ``send`` only enqueues, so a slow or stalled client never holds up the
+    rest of the room. When the queue is full the overflow policy decides
+    what gives: the oldest frame, an older frame of the same kind, or the
+    client itself.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        room_id: str,
+        user_id: str,
+        on_closed: Callable[["ClientConnection"], Awaitable[None]],
+        latency: Histogram,
+        max_queue: int = 256,
+        policy: str = DROP_OLDEST,
+        codec: Codec = DEFAULT_CODEC,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.room_id = room_id
+        self.user_id = user_id
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.codec = codec
+        self.dropped = 0
+        self.coalesced = 0
+        self._on_closed = on_closed
+        self._latency = latency
+        # (frame, coalesce_key, enqueued_at)
+        self._queue: Deque[Tuple[Frame, Optional[str], float]] = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def send(self, frame: Frame, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a frame for this client; returns False if the client is gone"""
+        if self._closed:
+            return False
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                self._evict()
+                return False
+            if self.policy == COALESCE and coalesce_key is not None and self._replace(frame, coalesce_key):
+                return True
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append((frame, coalesce_key, time.perf_counter()))
+        self._ready.set()
+        return True
+
+    def _replace(self, frame: Frame, coalesce_key: str) -> bool:
+        # Newest state wins: overwrite the most recent queued frame of the same kind
+        for index in range(len(self._queue) - 1, -1, -1):
+            _, key, enqueued_at = self._queue[index]
+            if key == coalesce_key:
+                self._queue[index] = (frame, key, enqueued_at)
+                self.coalesced += 1
+                return True
+        return False
+
+    def _evict(self) -> None:
+        logger.info("Disconnecting slow consumer %s in room %s", self.user_id, self.room_id)
+        self._closed = True
+        self._queue.clear()
+        self._evict_task = asyncio.create_task(self._close_slow_consumer())
+
+    async def _write_loop(self) -> None:
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            frame, _, enqueued_at = self._queue.popleft()
+            try:
+                if self.codec.binary:
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+            except Exception:
+                # Connection is broken; the manager removes it from the room
+                self._closed = True
+                self._queue.clear()
+                await self._on_closed(self)
+                return
+            self._latency.observe(time.perf_counter() - enqueued_at)
+
+    async def _close_slow_consumer(self) -> None:
+        self._writer.cancel()
+        try:
+            await self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+        await self._on_closed(self)
+
+    async def close(self) -> None:
+        """Stop the writer; called by the manager once the member has left"""
+        self._closed = True
+        self._queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
@@ -0,0 +1,69 @@
+import time
+from typing import Dict, Optional
+
+
+class PlaybackClock:
+    """Authoritative playback position for one room.
+
+    Stores only the last transition (anchor position, when it happened on
+    the monotonic clock, and the rate), so the current position is one
+    multiply-add no matter how long the room has been playing.
+    """
+
+    __slots__ = ("playing", "anchor_position", "anchor_time", "rate", "version", "updated_by")
+
+    def __init__(self) -> None:
+        self.playing = False
+        self.anchor_position = 0.0
+        self.anchor_time = time.monotonic()
+        self.rate = 1.0
+        self.version = 0
+        self.updated_by: Optional[str] = None
+
+    def position(self, now: Optional[float] = None) -> float:
+        if not self.playing:
+            return self.anchor_position
+        now = time.monotonic() if now is None else now
+        return self.anchor_position + (now - self.anchor_time) * self.rate
+
+    def _anchor(self, position: Optional[float], user_id: str) -> None:
+        now = time.monotonic()
+        if position is None:
+            position = self.position(now)
+        self.anchor_position = max(0.0, float(position))
+        self.anchor_time = now
+        self.version += 1
+        self.updated_by = user_id
+
+    def play(self, user_id: str, position: Optional[float] = None) -> None:
+        self._anchor(position, user_id)
+        self.playing = True
+
+    def pause(self, user_id: str, position: Optional[float] = None) -> None:
+        self._anchor(position, user_id)
+        self.playing = False
+
+    def seek(self, user_id: str, position: Optional[float]) -> None:
+        self._anchor(position, user_id)
+
+    def snapshot(self) -> Dict:
+        """Wire form; ``server_time`` lets other hosts rebuild the anchor"""
+        return {
+            "playing": self.playing,
+            "position": round(self.position(), 3),
+            "rate": self.rate,
+            "version": self.version,
+            "updated_by": self.updated_by,
+            "server_time": time.time(),
+        }
+
+    def adopt(self, snapshot: Dict) -> None:
+        """Take over a snapshot produced on another worker"""
+        elapsed = max(0.0, time.time() - float(snapshot.get("server_time", time.time())))
+        self.playing = bool(snapshot.get("playing"))
+        self.rate = float(snapshot.get("rate", 1.0))
+        position = float(snapshot.get("position", 0.0))
+        self.anchor_position = position + elapsed * self.rate if self.playing else position
+        self.anchor_time = time.monotonic()
+        self.version = int(snapshot.get("version", self.version))
+        self.updated_by = snapshot.get("updated_by")
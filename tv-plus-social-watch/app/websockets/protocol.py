@@ -0,0 +1,134 @@
+import abc
+import json
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import WebSocket
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary format
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+SUBPROTOCOL_PREFIX = "tvplus."
+
+
+class Codec(abc.ABC):
+    """Wire format for one WebSocket connection, fixed at connect time"""
+
+    name = ""
+    binary = False
+
+    @abc.abstractmethod
+    def encode(self, message: dict) -> Frame:
+        """Serialize an outbound message"""
+
+    @abc.abstractmethod
+    def loads(self, data: Frame):
+        """Parse a frame into whatever it holds; ``decode`` checks the result"""
+
+    def decode(self, data: Frame) -> dict:
+        """Parse an inbound frame; raises ValueError for anything that is not an object"""
+        try:
+            message = self.loads(data)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid {self.name} frame: {e}") from e
+        if not isinstance(message, dict):
+            raise ValueError(f"Invalid {self.name} frame: expected an object")
+        return message
+
+
+class JsonCodec(Codec):
+    """Default text JSON, what the browser client speaks"""
+
+    name = "json"
+
+    def encode(self, message: dict) -> Frame:
+        return json.dumps(message)
+
+    def loads(self, data: Frame):
+        return json.loads(data)
+
+
+class CompactJsonCodec(Codec):
+    """JSON without whitespace, through orjson when it is installed"""
+
+    name = "json-compact"
+
+    def encode(self, message: dict) -> Frame:
+        if orjson is not None:
+            return orjson.dumps(message).decode("utf-8")
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(self, data: Frame):
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """Binary MessagePack frames"""
+
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: dict) -> Frame:
+        return msgpack.packb(message, use_bin_type=True)
+
+    def loads(self, data: Frame):
+        if isinstance(data, str):
+            raise ValueError("msgpack connections must send binary frames")
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except msgpack.UnpackException as e:
+            raise ValueError(str(e)) from e
+
+
+DEFAULT_CODEC = JsonCodec()
+
+CODECS: Dict[str, Codec] = {DEFAULT_CODEC.name: DEFAULT_CODEC}
+CODECS[CompactJsonCodec.name] = CompactJsonCodec()
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+
+def negotiate(websocket: WebSocket) -> Tuple[Codec, Optional[str]]:
+    """Pick the connection's codec.
+
+    Clients offer ``Sec-WebSocket-Protocol: tvplus.msgpack, tvplus.json`` (in
+    order of preference) or pass ``?format=msgpack``. Returns the codec and
+    the subprotocol to echo back in the handshake, if one was negotiated.
+    """
+    offered: List[str] = websocket.scope.get("subprotocols") or []
+    for subprotocol in offered:
+        if subprotocol.startswith(SUBPROTOCOL_PREFIX):
+            codec = CODECS.get(subprotocol[len(SUBPROTOCOL_PREFIX):])
+            if codec is not None:
+                return codec, subprotocol
+
+    requested = websocket.query_params.get("format")
+    if requested in CODECS:
+        return CODECS[requested], None
+    return DEFAULT_CODEC, None
+
+
+class FrameCache:
+    """Encodes one outbound message at most once per codec"""
+
+    __slots__ = ("message", "_frames")
+
+    def __init__(self, message: dict) -> None:
+        self.message = message
+        self._frames: Dict[str, Frame] = {}
+
+    def frame_for(self, codec: Codec) -> Frame:
+        frame = self._frames.get(codec.name)
+        if frame is None:
+            frame = self._frames[codec.name] = codec.encode(self.message)
+        return frame
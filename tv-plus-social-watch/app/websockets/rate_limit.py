@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Message type -> event class; types not listed here are not limited
+EVENT_CLASSES = {
+    "chat": "chat",
+    "emoji": "emoji",
+    "play_pause": "playback",
+    "seek": "playback",
+}
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Token buckets per (room, user, event class).
+
+    ``rules`` maps an event class to ``(burst, refill_per_sec)``: a user may
+    send ``burst`` events at once, then one every ``1 / refill_per_sec``
+    seconds; a class whose ``refill_per_sec`` is 0 or less is not limited
+    at all (a bucket that never refills would lock users out for good).
+    Buckets are kept in least-recently-used order, so idle ones
+    (which would be full again anyway) are dropped from the front, and the
+    total never exceeds ``max_buckets``.
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[float, float]], max_buckets: int = 50000, idle_ttl: float = 300.0) -> None:
+        self.rules = {event_class: rule for event_class, rule in rules.items() if rule[1] > 0}
+        self.max_buckets = max(1, max_buckets)
+        self.idle_ttl = idle_ttl
+        self._buckets: "OrderedDict[Tuple[str, str, str], TokenBucket]" = OrderedDict()
+        self.allowed: Dict[str, int] = {event_class: 0 for event_class in rules}
+        self.rejected: Dict[str, int] = {event_class: 0 for event_class in rules}
+        self.evicted = 0
+
+    def check(self, room_id: str, user_id: str, message_type: Optional[str], now: Optional[float] = None) -> float:
+        """0.0 if the event may pass (and takes a token), else seconds until it could"""
+        event_class = EVENT_CLASSES.get(message_type or "")
+        rule = self.rules.get(event_class) if event_class else None
+        if rule is None:
+            return 0.0
+        burst, refill = rule
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+
+        key = (room_id, user_id, event_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(burst, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * refill)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+
+        if bucket.tokens >= 1.0:
+            bucket.tokens -= 1.0
+            self.allowed[event_class] += 1
+            return 0.0
+        self.rejected[event_class] += 1
+        return (1.0 - bucket.tokens) / refill
+
+    def _evict(self, now: float) -> None:
+        deadline = now - self.idle_ttl
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket.updated >= deadline:
+                break
+            del self._buckets[key]
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        return {
+            "buckets": len(self._buckets),
+            "max_buckets": self.max_buckets,
+            "evicted": self.evicted,
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+        }
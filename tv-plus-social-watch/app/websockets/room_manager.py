@@ -1,19 +1,145 @@
-from typing import Dict, Set
+from typing import Awaitable, Callable, Collection, Dict, List, Optional, Set, Tuple
+from collections import Counter
 from fastapi import WebSocket
-import json
+import math
 import asyncio
+import logging
 from datetime import datetime
 
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.services.chat_history import ChatHistoryWriter
+from .backends import FanoutBackend, InProcessBackend
+from .connection import ClientConnection, POLICIES
+from .protocol import Codec, DEFAULT_CODEC, FrameCache
+from .playback import PlaybackClock
+from .room_state import RoomState
+from .rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# State-like events where only the newest one matters to a lagging client
+COALESCE_TYPES = {"play_pause", "seek", "video_sync", "vote_update", "vote_tally"}
+PLAYBACK_TYPES = {"play_pause", "seek"}
+# Events after which the room_state stream may have something new to say
+STATE_TRIGGER_TYPES = {"user_joined", "user_left", "vote_tally"}
+
+# vote_status(room_id, member_count) -> (winner or None, total_voted)
+VoteStatusFn = Callable[[str, int], Awaitable[Tuple[Optional[dict], int]]]
+
+
+def _as_position(value) -> Optional[float]:
+    try:
+        position = float(value)
+    except (TypeError, ValueError):
+        return None
+    return position if math.isfinite(position) else None
+
+
+def _playback_action(message: dict) -> str:
+    """``sync_events.action`` for a play_pause/seek frame"""
+    if message.get("type") == "seek":
+        return "seek"
+    return "play" if message.get("action") == "play" else "pause"
+
 
 class RoomManager:
-    def __init__(self) -> None:
-        self._rooms: Dict[str, Dict[str, WebSocket]] = {}
-        self._user_last_message: Dict[str, float] = {}
+    def __init__(
+        self,
+        backend: Optional[FanoutBackend] = None,
+        send_queue_size: int = settings.ws_send_queue_size,
+        slow_consumer_policy: str = settings.ws_slow_consumer_policy,
+        history: Optional[ChatHistoryWriter] = None,
+        vote_status: Optional[VoteStatusFn] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        emoji_window: float = settings.ws_emoji_window,
+        playback_window: float = settings.ws_playback_window,
+        playback_leading: bool = settings.ws_playback_leading,
+    ) -> None:
+        if slow_consumer_policy not in POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self._rooms: Dict[str, Dict[str, ClientConnection]] = {}
+        self._rate_limiter = rate_limiter or RateLimiter(
+            {
+                "chat": (settings.ws_rate_chat_burst, settings.ws_rate_chat_per_sec),
+                "emoji": (settings.ws_rate_emoji_burst, settings.ws_rate_emoji_per_sec),
+                "playback": (settings.ws_rate_playback_burst, settings.ws_rate_playback_per_sec),
+            },
+            max_buckets=settings.ws_rate_max_buckets,
+            idle_ttl=settings.ws_rate_idle_ttl,
+        )
+        self._backend = backend or InProcessBackend()
+        self._send_queue_size = send_queue_size
+        self._slow_consumer_policy = slow_consumer_policy
+        self._fanout_latency: Dict[str, Histogram] = {}
+        self._history = history
+        self._playback: Dict[str, PlaybackClock] = {}
+        self._subscribers: Dict[str, List[Callable[[str, dict], None]]] = {}
+        self._vote_status = vote_status
+        self._room_state: Dict[str, RoomState] = {}
+        # room_id -> members that still need a full snapshot
+        self._state_dirty: Dict[str, Set[str]] = {}
+        self._state_task: Optional[asyncio.Task] = None
+        # Emoji reactions gathered per room for up to emoji_window seconds (0 = send each)
+        self._emoji_window = emoji_window
+        self._emoji_pending: Dict[str, Counter] = {}
+        self._emoji_tasks: Dict[str, asyncio.Task] = {}
+        self._emoji_received = 0
+        self._emoji_bursts = 0
+        # play_pause/seek relayed at most once per playback_window per room (0 = every event)
+        self._playback_window = playback_window
+        self._playback_leading = playback_leading
+        self._playback_pending: Dict[str, dict] = {}
+        self._playback_timers: Dict[str, asyncio.Task] = {}
+        self._playback_sent = 0
+        self._playback_superseded = 0
+
+    def subscribe(self, message_type: str, handler: Callable[[str, dict], None]) -> None:
+        """Call ``handler(room_id, message)`` for every event of this type, from any worker"""
+        self._subscribers.setdefault(message_type, []).append(handler)
 
-    async def join(self, room_id: str, user_id: str, websocket: WebSocket) -> None:
+    def notify_peers(self, room_id: str, message: dict) -> None:
+        """Run the other workers' subscribers for ``message`` without sending it to any socket"""
+        self._backend.notify_peers(room_id, {**message, "internal": True})
+
+    async def start(self) -> None:
+        await self._backend.start(self._deliver_local, self._local_presence)
+
+    async def stop(self) -> None:
+        timers = list(self._emoji_tasks.values()) + list(self._playback_timers.values())
+        for task in timers:
+            task.cancel()
+        await asyncio.gather(*timers, return_exceptions=True)
+        await self._backend.stop()
+        for members in self._rooms.values():
+            for conn in members.values():
+                await conn.close()
+        self._rooms.clear()
+
+    async def join(self, room_id: str, user_id: str, websocket: WebSocket, codec: Codec = DEFAULT_CODEC) -> None:
         if room_id not in self._rooms:
             self._rooms[room_id] = {}
-        self._rooms[room_id][user_id] = websocket
+            self._fanout_latency[room_id] = Histogram()
+        previous = self._rooms[room_id].get(user_id)
+        if previous:
+            # Same user reconnected; retire the old socket's writer
+            await previous.close()
+        self._rooms[room_id][user_id] = ClientConnection(
+            websocket,
+            room_id,
+            user_id,
+            on_closed=self._on_connection_closed,
+            latency=self._fanout_latency[room_id],
+            max_queue=self._send_queue_size,
+            policy=self._slow_consumer_policy,
+            codec=codec,
+        )
+        await self._backend.presence_changed(room_id, user_id, joined=True)
+        
+        # Bring the newcomer to the room's current position straight away
+        if room_id in self._playback:
+            self._send_playback(room_id, user_id)
+        self._mark_state_dirty(room_id, newcomer=user_id)
         
         # Notify others about new user
         await self.broadcast_to_room(room_id, {
@@ -22,11 +148,19 @@ class RoomManager:
             "timestamp": datetime.now().isoformat()
         }, exclude_user=user_id)
 
-    async def leave(self, room_id: str, user_id: str) -> None:
+    async def leave(self, room_id: str, user_id: str, websocket: Optional[WebSocket] = None) -> None:
         if room_id in self._rooms and user_id in self._rooms[room_id]:
-            del self._rooms[room_id][user_id]
+            if websocket is not None and self._rooms[room_id][user_id].websocket is not websocket:
+                # A newer connection for this user has already replaced this one
+                return
+            conn = self._rooms[room_id].pop(user_id)
+            await conn.close()
             if not self._rooms[room_id]:
                 del self._rooms[room_id]
+                self._fanout_latency.pop(room_id, None)
+                self._playback.pop(room_id, None)
+                self._room_state.pop(room_id, None)
+            await self._backend.presence_changed(room_id, user_id, joined=False)
             
             # Notify others about user leaving
             await self.broadcast_to_room(room_id, {
@@ -36,66 +170,314 @@ class RoomManager:
             })
 
     def get_room_users(self, room_id: str) -> Set[str]:
-        return set(self._rooms.get(room_id, {}).keys())
+        """Members of the room across every worker"""
+        return set(self._rooms.get(room_id, {}).keys()) | self._backend.remote_users(room_id)
+
+    def _local_presence(self) -> Dict[str, Set[str]]:
+        return {room_id: set(members) for room_id, members in self._rooms.items()}
 
     async def broadcast_to_room(self, room_id: str, message: dict, exclude_user: str = None) -> None:
-        if room_id not in self._rooms:
+        await self._backend.publish(room_id, message, exclude_user)
+
+    async def _deliver_local(self, room_id: str, message: dict, exclude_user: Optional[str] = None) -> None:
+        """Queue the message for the members of the room connected to this worker"""
+        for handler in self._subscribers.get(message.get("type"), ()):
+            handler(room_id, message)
+        if message.get("internal") or room_id not in self._rooms:
             return
             
-        message_str = json.dumps(message)
-        disconnected_users = []
+        if message.get("type") in PLAYBACK_TYPES and "playback" in message:
+            self._adopt_playback(room_id, message["playback"])
+        if message.get("type") in STATE_TRIGGER_TYPES:
+            self._mark_state_dirty(room_id)
         
-        for user_id, websocket in self._rooms[room_id].items():
-            if exclude_user and user_id == exclude_user:
+        self._send_local(room_id, message, exclude=(exclude_user,) if exclude_user else ())
+
+    def _send_local(
+        self,
+        room_id: str,
+        message: dict,
+        exclude: Collection[str] = (),
+        only: Optional[Collection[str]] = None,
+    ) -> None:
+        # Serialize once per wire format, not once per member
+        frames = FrameCache(message)
+        coalesce_key = message.get("type") if message.get("type") in COALESCE_TYPES else None
+        
+        for user_id, conn in list(self._rooms.get(room_id, {}).items()):
+            if user_id in exclude or (only is not None and user_id not in only):
                 continue
-                
+            conn.send(frames.frame_for(conn.codec), coalesce_key)
+
+    async def _on_connection_closed(self, conn: ClientConnection) -> None:
+        # Only remove the member if this is still their current connection
+        if self._rooms.get(conn.room_id, {}).get(conn.user_id) is conn:
+            await self.leave(conn.room_id, conn.user_id)
+
+    def stats(self) -> Dict:
+        """Per-room fan-out latency (enqueue to socket write) and queue health"""
+        rooms = {}
+        for room_id, members in self._rooms.items():
+            rooms[room_id] = {
+                "members": len(members),
+                "queued": sum(conn.queued for conn in members.values()),
+                "dropped": sum(conn.dropped for conn in members.values()),
+                "coalesced": sum(conn.coalesced for conn in members.values()),
+                "fanout_latency": self._fanout_latency[room_id].snapshot(),
+            }
+        return {
+            "send_queue_size": self._send_queue_size,
+            "slow_consumer_policy": self._slow_consumer_policy,
+            "rate_limit": self._rate_limiter.stats(),
+            "emoji": {
+                "window": self._emoji_window,
+                "received": self._emoji_received,
+                "bursts": self._emoji_bursts,
+            },
+            "playback_coalescing": {
+                "window": self._playback_window,
+                "leading": self._playback_leading,
+                "sent": self._playback_sent,
+                "superseded": self._playback_superseded,
+            },
+            "rooms": rooms,
+        }
+
+    def _send_to(self, room_id: str, user_id: str, message: dict) -> None:
+        conn = self._rooms.get(room_id, {}).get(user_id)
+        if conn:
+            conn.send(conn.codec.encode(message))
+
+    def playback_state(self, room_id: str) -> Dict:
+        clock = self._playback.get(room_id) or PlaybackClock()
+        return clock.snapshot()
+
+    def _send_playback(self, room_id: str, user_id: str) -> None:
+        self._send_to(room_id, user_id, {"type": "sync_state", **self.playback_state(room_id)})
+
+    def _adopt_playback(self, room_id: str, snapshot: Dict) -> None:
+        # Playback transitions made on another worker
+        if room_id not in self._rooms:
+            return
+        clock = self._playback.setdefault(room_id, PlaybackClock())
+        if int(snapshot.get("version", 0)) > clock.version:
+            clock.adopt(snapshot)
+
+    def _apply_playback(self, room_id: str, user_id: str, message_data: dict) -> None:
+        """Advance the room's clock for a play_pause/seek frame"""
+        clock = self._playback.setdefault(room_id, PlaybackClock())
+        position = _as_position(message_data.get("position"))
+        action = _playback_action(message_data)
+        if action == "seek":
+            clock.seek(user_id, position)
+        elif action == "play":
+            clock.play(user_id, position)
+        else:
+            clock.pause(user_id, position)
+        message_data["playback"] = clock.snapshot()
+
+    def _mark_state_dirty(self, room_id: str, newcomer: Optional[str] = None) -> None:
+        if room_id not in self._rooms:
+            return
+        pending = self._state_dirty.setdefault(room_id, set())
+        if newcomer:
+            pending.add(newcomer)
+        if self._state_task is None or self._state_task.done():
+            self._state_task = asyncio.create_task(self._flush_room_state())
+
+    async def _flush_room_state(self) -> None:
+        # Yield once so a burst of triggers collapses into one refresh per room
+        await asyncio.sleep(0)
+        while self._state_dirty:
+            room_id, newcomers = self._state_dirty.popitem()
             try:
-                await websocket.send_text(message_str)
+                await self._refresh_room_state(room_id, newcomers)
             except Exception:
-                # Connection is broken, mark for removal
-                disconnected_users.append(user_id)
-        
-        # Clean up disconnected users
-        for user_id in disconnected_users:
-            await self.leave(room_id, user_id)
-
-    def check_rate_limit(self, user_id: str) -> bool:
-        """Check if user can send message (2 second rate limit)"""
-        now = asyncio.get_event_loop().time()
-        last_time = self._user_last_message.get(user_id, 0)
-        
-        if now - last_time < 2.0:
-            return False
-            
-        self._user_last_message[user_id] = now
-        return True
+                logger.exception("Failed to refresh room_state for %s", room_id)
+
+    async def _refresh_room_state(self, room_id: str, newcomers: Set[str]) -> None:
+        """Recompute the room's state and send a delta only if something changed.
+
+        Each worker computes this for its own members from events every
+        worker sees, so room_state frames are never sent through the backend.
+        """
+        fields = await self._compute_room_state(room_id)
+        if room_id not in self._rooms:
+            return
+        state = self._room_state.setdefault(room_id, RoomState())
+        changes = state.update(fields)
+        if changes:
+            self._send_local(room_id, state.delta_message(changes), exclude=newcomers)
+        if newcomers:
+            self._send_local(room_id, state.full_message(), only=newcomers)
+
+    async def _compute_room_state(self, room_id: str) -> Dict:
+        members = sorted(self.get_room_users(room_id))
+        fields = {"members": members, "user_count": len(members)}
+        if self._vote_status is None:
+            return fields
+        try:
+            winner, total_voted = await self._vote_status(room_id, len(members))
+        except Exception:
+            logger.exception("Vote status unavailable for room_state of %s", room_id)
+            return fields
+        fields["votes"] = {
+            "total_voted": total_voted,
+            "room_user_count": len(members),
+            "voting_status": "complete" if winner else "pending",
+        }
+        fields["winner"] = winner
+        return fields
+
+    def check_rate_limit(self, room_id: str, user_id: str, message_type: Optional[str]) -> float:
+        """0.0 if the user may send this event now, else seconds to wait"""
+        return self._rate_limiter.check(room_id, user_id, message_type)
 
     async def handle_message(self, room_id: str, user_id: str, message_data: dict) -> None:
         """Handle incoming WebSocket message"""
         message_type = message_data.get("type")
         
-        if message_type in ["chat", "emoji"]:
-            # Apply rate limiting
-            if not self.check_rate_limit(user_id):
-                # Send rate limit warning to user
-                websocket = self._rooms.get(room_id, {}).get(user_id)
-                if websocket:
-                    try:
-                        await websocket.send_text(json.dumps({
-                            "type": "rate_limit",
-                            "message": "Çok hızlı mesaj gönderiyorsunuz. 2 saniye bekleyin."
-                        }))
-                    except Exception:
-                        pass
+        retry_after = self.check_rate_limit(room_id, user_id, message_type)
+        if retry_after:
+            if message_type in PLAYBACK_TYPES:
+                # The clock did not move; put the sender back on the room's state
+                self._send_playback(room_id, user_id)
                 return
+            # Send rate limit warning to user
+            self._send_to(room_id, user_id, {
+                "type": "rate_limit",
+                "event": message_type,
+                "retry_after": round(retry_after, 2),
+                "message": f"Çok hızlı mesaj gönderiyorsunuz. {math.ceil(retry_after)} saniye bekleyin."
+            })
+            return
+        
+        if message_type == "sync_request":
+            # Answered from the server clock, nothing to relay
+            self._send_playback(room_id, user_id)
+            return
+        
+        if message_type == "room_state_request":
+            # Client missed a delta; resend the full state to it only
+            self._mark_state_dirty(room_id, newcomer=user_id)
+            return
         
         # Add timestamp and user info
+        now = datetime.now()
         message_data["user_id"] = user_id
-        message_data["timestamp"] = datetime.now().isoformat()
+        message_data["timestamp"] = now.isoformat()
+        
+        # Queue for write-behind persistence; never waits on the database
+        if self._history is not None and message_type in ["chat", "emoji"]:
+            content = message_data.get("message" if message_type == "chat" else "emoji")
+            if isinstance(content, str) and content:
+                self._history.record(message_type, room_id, user_id, content, now)
+        
+        if message_type in PLAYBACK_TYPES:
+            # The clock moves on every event; only the relay is coalesced
+            self._apply_playback(room_id, user_id, message_data)
+            await self._relay_playback(room_id, message_data)
+            return
+        
+        if message_type == "emoji" and self._emoji_window > 0:
+            emoji = message_data.get("emoji")
+            if isinstance(emoji, str) and emoji:
+                self._queue_emoji(room_id, emoji)
+            return
         
         # Broadcast to all users in room
         await self.broadcast_to_room(room_id, message_data)
 
+    async def _relay_playback(self, room_id: str, message: dict) -> None:
+        """Broadcast play_pause/seek with last-write-wins inside a short window.
+
+        In a quiet room the first event goes out at once (leading edge, if
+        enabled) and opens a window; events inside it only replace the
+        pending one, which is sent when the window closes. Scrubbing thus
+        costs at most one frame per window however fast it is. A pause can
+        be superseded by a later seek, so every relayed frame carries the
+        room's full ``playback`` snapshot and clients apply that rather
+        than the frame's own action or position. Only relayed frames are
+        written to ``sync_events``; superseded ones never reach the database.
+        """
+        if self._playback_window <= 0:
+            await self._broadcast_playback(room_id, message)
+            return
+        if room_id in self._playback_timers:
+            if room_id in self._playback_pending:
+                self._playback_superseded += 1
+            self._playback_pending[room_id] = message
+            return
+        self._playback_timers[room_id] = asyncio.create_task(self._flush_playback(room_id))
+        if self._playback_leading:
+            await self._broadcast_playback(room_id, message)
+        else:
+            self._playback_pending[room_id] = message
+
+    async def _flush_playback(self, room_id: str) -> None:
+        try:
+            await asyncio.sleep(self._playback_window)
+        finally:
+            message = self._playback_pending.pop(room_id, None)
+            self._playback_timers.pop(room_id, None)
+        if message is None:
+            return
+        clock = self._playback.get(room_id)
+        if clock is not None:
+            # The clock already holds this event's result; send it fresh
+            message["playback"] = clock.snapshot()
+        # Keep the window open so continued scrubbing stays throttled
+        self._playback_timers[room_id] = asyncio.create_task(self._flush_playback(room_id))
+        try:
+            await self._broadcast_playback(room_id, message)
+        except Exception:
+            logger.exception("Failed to relay playback event for %s", room_id)
+
+    async def _broadcast_playback(self, room_id: str, message: dict) -> None:
+        """Relay one play_pause/seek frame and record it as the room's transition"""
+        self._playback_sent += 1
+        if self._history is not None:
+            self._history.record_sync(
+                room_id,
+                message["user_id"],
+                _playback_action(message),
+                datetime.fromisoformat(message["timestamp"]),
+                int(message["playback"]["position"]),
+            )
+        await self.broadcast_to_room(room_id, message)
+
+    def _queue_emoji(self, room_id: str, emoji: str) -> None:
+        self._emoji_received += 1
+        pending = self._emoji_pending.get(room_id)
+        if pending is None:
+            pending = self._emoji_pending[room_id] = Counter()
+            self._emoji_tasks[room_id] = asyncio.create_task(self._flush_emojis(room_id))
+        pending[emoji] += 1
+
+    async def _flush_emojis(self, room_id: str) -> None:
+        """Send the room's reactions of one window as a single emoji_burst frame.
+
+        Members get one frame per window however many reactions arrived;
+        each reaction was already recorded individually for persistence.
+        """
+        try:
+            await asyncio.sleep(self._emoji_window)
+        finally:
+            counts = self._emoji_pending.pop(room_id, None)
+            self._emoji_tasks.pop(room_id, None)
+        if not counts:
+            return
+        self._emoji_bursts += 1
+        try:
+            await self.broadcast_to_room(room_id, {
+                "type": "emoji_burst",
+                "counts": dict(counts),
+                "total": sum(counts.values()),
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception:
+            logger.exception("Failed to send emoji burst for %s", room_id)
+
     async def sync_video_state(self, room_id: str, user_id: str, action: str, position: int) -> None:
         """Sync video playback state across room"""
         await self.broadcast_to_room(room_id, {
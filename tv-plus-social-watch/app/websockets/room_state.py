@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional
+
+
+class RoomState:
+    """Last room state sent to this worker's members, with a version counter.
+
+    ``update`` returns only the fields that changed (or None), so members
+    receive a delta when something actually moved and nothing otherwise.
+    Clients that see a gap in ``version`` ask for a full snapshot.
+    """
+
+    __slots__ = ("version", "fields")
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.fields: Dict[str, Any] = {}
+
+    def update(self, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        changes = {
+            key: value for key, value in fields.items()
+            if key not in self.fields or self.fields[key] != value
+        }
+        if not changes and self.version:
+            return None
+        self.fields.update(changes)
+        self.version += 1
+        return changes
+
+    def delta_message(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "room_state", "version": self.version, "full": False, "changes": changes}
+
+    def full_message(self) -> Dict[str, Any]:
+        return {"type": "room_state", "version": self.version, "full": True, "changes": dict(self.fields)}
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """
 Apply database schema to Supabase - Simple version
+
+Runs the pending files in migrations/ (recorded in schema_migrations).
+Usage: python apply_schema_simple.py [--list]
 """
 import os
+import sys
 import asyncio
-import psycopg
 from dotenv import load_dotenv
 
 # Fix Windows event loop issue
@@ -14,46 +17,27 @@ if os.name == 'nt':  # Windows
 # Load environment variables
 load_dotenv()
 
-async def apply_schema():
-    """Apply the database schema"""
-    # Build connection
-    host = os.getenv("DB_HOST")
-    user = os.getenv("DB_USER")
-    password = os.getenv("DB_PASSWORD")
-    database = os.getenv("DB_DATABASE", "postgres")
-    port = int(os.getenv("DB_PORT", "5432"))
-
-    if host and user and password:
-        conn_kwargs = {
-            "host": host,
-            "user": user,
-            "password": password,
-            "dbname": database,
-            "port": port,
-            "sslmode": "require",
-        }
-    else:
-        connection_string = os.getenv("DATABASE_URL")
-        if not connection_string:
-            print("❌ Database configuration missing")
-            return 1
-        conn_kwargs = {"conninfo": connection_string, "sslmode": "require"}
+async def apply_schema(list_only: bool = False):
+    """Apply pending migrations (or just list their status)"""
+    # Imported after load_dotenv so settings see the .env values
+    from app.services.migrations import run_migrations, migration_status
 
     try:
-        # Read schema file
-        with open("schema.sql", "r", encoding="utf-8") as f:
-            schema_sql = f.read()
+        if list_only:
+            for version, name, done in await migration_status():
+                print(f"{'✅' if done else '⏳'} {version}_{name}")
+            return 0
 
-        async with await psycopg.AsyncConnection.connect(**conn_kwargs) as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(schema_sql)
-                await conn.commit()
-                print("✅ Schema applied successfully")
+        applied = await run_migrations()
+        if applied:
+            print(f"✅ Schema applied successfully ({', '.join(applied)})")
+        else:
+            print("✅ Schema is up to date")
     except Exception as err:
         print(f"❌ Schema application error: {err}")
         return 1
 
 if __name__ == "__main__":
-    exit_code = asyncio.run(apply_schema())
+    exit_code = asyncio.run(apply_schema("--list" in sys.argv[1:]))
     if exit_code:
         exit(exit_code)
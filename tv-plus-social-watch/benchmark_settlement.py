@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark the settlement planner (no database needed)
+
+Builds random rooms of growing size, computes balances the same way the
+API does and times settle(). Usage: python benchmark_settlement.py [max_members]
+"""
+import sys
+import time
+import random
+from decimal import Decimal
+
+from app.services.split_service import settle
+
+
+def random_nets(members: int, expenses_per_member: int = 3) -> dict:
+    paid = {f"user_{i}": Decimal(0) for i in range(members)}
+    weight = {f"user_{i}": Decimal(0) for i in range(members)}
+    for _ in range(members * expenses_per_member):
+        user_id = f"user_{random.randrange(members)}"
+        paid[user_id] += Decimal(random.randint(100, 50000)) / 100
+        weight[user_id] += Decimal(random.choice(["0.5", "1.0", "1.5", "2.0"]))
+    total = sum(paid.values())
+    total_weight = sum(weight.values()) or Decimal(1)
+    return {user_id: paid[user_id] - total * weight[user_id] / total_weight for user_id in paid}
+
+
+def main():
+    max_members = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(42)
+    print(f"{'members':>10} {'transfers':>10} {'ms':>10} {'µs/member':>10}")
+    members = 10
+    while members <= max_members:
+        nets = random_nets(members)
+        start = time.perf_counter()
+        transfers = settle(nets)
+        elapsed = time.perf_counter() - start
+        assert len(transfers) <= members - 1
+        print(f"{members:>10} {len(transfers):>10} {elapsed * 1000:>10.2f} {elapsed / members * 1e6:>10.2f}")
+        members *= 10
+
+
+if __name__ == "__main__":
+    main()
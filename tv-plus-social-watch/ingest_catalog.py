@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Load a catalog feed (CSV with a header row, or JSON Lines) into the database
+
+Usage: python ingest_catalog.py FILE [--format csv|jsonl] [--batch-size N]
+The format defaults to the file extension.
+"""
+import os
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Fix Windows event loop issue
+if os.name == 'nt':  # Windows
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Load environment variables
+load_dotenv()
+
+def print_progress(progress):
+    print(
+        f"   ⏳ {progress['received']:,} rows read, {progress['written']:,} written, "
+        f"{progress['rejected']:,} rejected ({progress['rows_per_sec']:,} rows/s)"
+    )
+
+async def main(argv):
+    # Imported after load_dotenv so settings see the .env values
+    from app.core.config import settings
+    from app.services.catalog_ingest import FORMATS, aiter_file_lines, aiter_records, ingest
+
+    parser = argparse.ArgumentParser(description="Catalog bulk ingest")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--batch-size", type=int, default=settings.catalog_ingest_batch_size)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    print(f"📥 Ingesting {args.path} ({fmt}, batches of {args.batch_size})")
+    try:
+        result = await ingest(
+            aiter_records(aiter_file_lines(args.path), fmt),
+            batch_size=max(1, args.batch_size),
+            on_progress=print_progress,
+        )
+    except Exception as err:
+        print(f"❌ Catalog ingest failed: {err}")
+        return 1
+    print(f"✅ Done: {result}")
+    return 0
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main(sys.argv[1:]))
+    if exit_code:
+        exit(exit_code)
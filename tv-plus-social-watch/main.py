@@ -1,9 +1,9 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-import json
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
+import asyncio
 
 # Load environment variables
 load_dotenv()
@@ -13,98 +13,90 @@ from app.api.vote_routes import router as vote_router
 from app.api.expense_routes import router as expense_router
 from app.api.chat_routes import router as chat_router
 from app.api.user_routes import router as user_router
+from app.api.catalog_routes import router as catalog_router
 from app.api import router as db_router
+from app.services.db import pool_stats
+from app.services.chat_history import ChatHistoryWriter
+from app.services.voting_service import tallies, on_vote_event, get_winner
+from app.services.versions import versions
+from app.services.cache import caches, cache_stats, invalidate_remote
+from app.services.seed import start_background_seed
 from app.core.config import settings
 from app.websockets.room_manager import RoomManager
+from app.websockets.backends import create_backend
+from app.websockets.protocol import negotiate
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize all data on startup - database only"""
-    from app.services.db import get_cursor
-    from datetime import datetime, timedelta
-    
-    print("\n" + "="*60)
-    print("🚀 INITIALIZING DATABASE...")
-    print("="*60 + "\n")
+    """Open the pool, apply migrations and start the background services"""
+    from app.services.db import open_pool, close_pool
     
     try:
-        async with get_cursor() as cur:
-            # 1. Create users
-            print("👥 Creating users...")
-            users = [
-                ("user_1", "Ali", "👨"),
-                ("user_2", "Ayşe", "👩"),
-                ("user_3", "Mehmet", "🧑"),
-                ("host_1", "Moderatör", "👑")
-            ]
-            for user_id, name, avatar in users:
-                await cur.execute(
-                    "INSERT INTO users (user_id, name, avatar) VALUES (%s, %s, %s) ON CONFLICT (user_id) DO NOTHING",
-                    (user_id, name, avatar)
-                )
-            print(f"   ✅ {len(users)} users added")
-            
-            # 2. Create catalog
-            print("\n🎬 Creating catalog...")
-            catalog = [
-                ("interstellar", "Yıldızlararası", "movie", 169, "bilim-kurgu,dram,macera"),
-                ("fight_club", "Fight Club", "movie", 139, "dram,gerilim,aksiyon"),
-                ("star_wars", "Star Wars", "movie", 121, "bilim-kurgu,macera,fantazi")
-            ]
-            for content_id, title, content_type, duration, tags in catalog:
-                await cur.execute(
-                    "INSERT INTO catalog (content_id, title, type, duration_min, tags) VALUES (%s, %s, %s, %s, %s) ON CONFLICT (content_id) DO NOTHING",
-                    (content_id, title, content_type, duration, tags)
-                )
-            print(f"   ✅ {len(catalog)} movies added to catalog")
-            
-            # 3. Create room
-            print("\n🏠 Creating room...")
-            start_time = datetime.now() + timedelta(hours=1)
-            await cur.execute(
-                "INSERT INTO rooms (room_id, title, start_at, host_id) VALUES (%s, %s, %s, %s) ON CONFLICT (room_id) DO UPDATE SET title = EXCLUDED.title, start_at = EXCLUDED.start_at",
-                ("room_1", "Akşam Film Gecesi", start_time, "host_1")
-            )
-            print("   ✅ room_1 created")
-            
-            # 4. Create candidates (voting options)
-            print("\n🗳️  Creating voting candidates...")
-            candidates = [
-                ("room_1", "interstellar"),
-                ("room_1", "fight_club"),
-                ("room_1", "star_wars")
-            ]
-            for room_id, content_id in candidates:
-                await cur.execute(
-                    "INSERT INTO candidates (room_id, content_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                    (room_id, content_id)
-                )
-            print(f"   ✅ {len(candidates)} voting candidates added")
-            
-            await cur.connection.commit()
-            
-            print("\n" + "="*60)
-            print("✅ DATABASE INITIALIZED SUCCESSFULLY!")
-            print("="*60)
-            print("\n📊 Available data:")
-            print(f"   - {len(users)} users")
-            print(f"   - {len(catalog)} movies")
-            print(f"   - 1 room (room_1)")
-            print(f"   - {len(candidates)} voting candidates")
-            print("\n🎉 Ready to use at: http://localhost:8000/app\n")
-            
+        await open_pool()
+        print("🔌 Database connection pool ready")
     except Exception as e:
-        print(f"\n❌ Database initialization failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"⚠️  Connection pool unavailable, using direct connections: {e}")
+    
+    if settings.db_migrate_on_startup:
+        from app.services.migrations import run_migrations
+        try:
+            applied = await run_migrations()
+            print(f"🧱 Schema migrations applied: {', '.join(applied)}" if applied else "🧱 Schema is up to date")
+        except Exception as e:
+            # Later code relies on the new schema (unique keys, ledger); don't serve on the old one
+            print(f"❌ Schema migrations failed, not starting: {e}")
+            await close_pool()
+            raise
+    
+    await chat_history.start()
+    await tallies.start()
+    await manager.start()
+    
+    # Demo data is seeded off the startup path, and only when enabled
+    seed_task = start_background_seed() if settings.seed_on_startup else None
     
     yield
-    # Cleanup (if needed)
+    
+    if seed_task is not None:
+        seed_task.cancel()
+        await asyncio.gather(seed_task, return_exceptions=True)
+    await manager.stop()
+    await tallies.stop()
+    # Drain buffered chat/emoji rows before the pool goes away
+    await chat_history.stop()
+    await close_pool()
 
 
 app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
-manager = RoomManager()
+chat_history = ChatHistoryWriter(
+    batch_size=settings.chat_flush_batch_size,
+    flush_interval=settings.chat_flush_interval,
+    max_queue=settings.chat_queue_size,
+)
+manager = RoomManager(
+    create_backend(settings.ws_backend),
+    history=chat_history,
+    vote_status=get_winner,
+)
+manager.subscribe("vote_tally", on_vote_event)
+
+# ETag versions: relay local writes to the other workers, apply theirs here
+versions.on_bump(lambda room_id, resource: manager.notify_peers(
+    room_id, {"type": "resource_bump", "resource": resource}
+))
+manager.subscribe("resource_bump", lambda room_id, message: versions.bump(
+    room_id, message["resource"], propagate=False
+))
+
+# Read-through caches: same relay for explicit invalidations (key None = clear)
+for cache in caches.values():
+    cache.on_invalidate(lambda name, key: manager.notify_peers(
+        "", {"type": "cache_invalidate", "cache": name, "key": key}
+    ))
+manager.subscribe("cache_invalidate", lambda room_id, message: invalidate_remote(
+    message["cache"], message.get("key")
+))
 
 # Store manager in app state so routes can access it
 app.state.manager = manager
@@ -116,6 +108,7 @@ app.include_router(room_router)
 app.include_router(vote_router)
 app.include_router(expense_router)
 app.include_router(chat_router)
+app.include_router(catalog_router)
 app.include_router(db_router)
 
 
@@ -141,31 +134,57 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "db_pool": pool_stats(),
+        "websocket": manager.stats(),
+        "chat_history": chat_history.stats(),
+        "cache": cache_stats(),
+    }
+
+
 @app.get("/rooms/{room_id}/status")
 def get_room_status(room_id: str):
     users = manager.get_room_users(room_id)
     return {
         "room_id": room_id,
         "user_count": len(users),
-        "users": list(users)
+        "users": list(users),
+        "playback": manager.playback_state(room_id)
     }
 
 
 @app.websocket("/ws/{room_id}/{user_id}")
 async def ws_endpoint(websocket: WebSocket, room_id: str, user_id: str):
-    await websocket.accept()
-    await manager.join(room_id, user_id, websocket)
+    # Wire format is chosen once per connection (subprotocol or ?format=)
+    codec, subprotocol = negotiate(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    await manager.join(room_id, user_id, websocket, codec)
     
     try:
         while True:
-            data = await websocket.receive_text()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            data = frame.get("bytes") if frame.get("text") is None else frame["text"]
             try:
-                message_data = json.loads(data)
-                await manager.handle_message(room_id, user_id, message_data)
-            except json.JSONDecodeError:
-                # Invalid JSON, ignore
-                pass
+                message_data = codec.decode(data)
+            except ValueError:
+                # Malformed frame, ignore
+                continue
+            await manager.handle_message(room_id, user_id, message_data)
     except WebSocketDisconnect:
-        await manager.leave(room_id, user_id)
+        await manager.leave(room_id, user_id, websocket)
+
 
+if __name__ == "__main__":
+    import uvicorn
 
+    uvicorn.run(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        ws_per_message_deflate=settings.ws_per_message_deflate,
+    )
@@ -0,0 +1,6 @@
+-- Row ids give the chat timeline a stable tiebreaker for keyset pagination
+alter table public.chat add column if not exists id bigserial;
+alter table public.emojis add column if not exists id bigserial;
+
+create index if not exists chat_room_created_idx on public.chat (room_id, created_at, id);
+create index if not exists emojis_room_created_idx on public.emojis (room_id, created_at, id);
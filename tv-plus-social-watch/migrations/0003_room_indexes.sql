@@ -0,0 +1,5 @@
+-- Per-room lookups used by the services; without these every one is a seq scan
+create index if not exists votes_room_content_idx on public.votes (room_id, content_id);
+create index if not exists expenses_room_idx on public.expenses (room_id);
+create index if not exists sync_events_room_ts_idx on public.sync_events (room_id, ts);
+create index if not exists rooms_start_at_idx on public.rooms (start_at desc);
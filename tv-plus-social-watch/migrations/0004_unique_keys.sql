@@ -0,0 +1,16 @@
+-- One vote per user per room, and each candidate once per room.
+-- Duplicates written before these keys existed are dropped first. Neither
+-- table has a timestamp or id to order by, so which row of a duplicate group
+-- survives is arbitrary (ctid is physical position, not write order); for
+-- candidates the rows are identical, for votes any one of the user's votes
+-- may be kept.
+delete from public.votes a
+using public.votes b
+where a.room_id = b.room_id and a.user_id = b.user_id and a.ctid < b.ctid;
+
+delete from public.candidates a
+using public.candidates b
+where a.room_id = b.room_id and a.content_id = b.content_id and a.ctid < b.ctid;
+
+create unique index if not exists votes_room_user_key on public.votes (room_id, user_id);
+create unique index if not exists candidates_room_content_key on public.candidates (room_id, content_id);
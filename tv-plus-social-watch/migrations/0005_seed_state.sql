@@ -0,0 +1,6 @@
+-- Fingerprint of the last applied demo seed, so unchanged seeds are skipped
+create table if not exists public.seed_state (
+  name varchar primary key,
+  fingerprint varchar not null,
+  applied_at timestamp default now()
+);
@@ -0,0 +1,17 @@
+-- Running per-room, per-user expense totals, kept in step by add_expense
+create table if not exists public.expense_ledger (
+  room_id varchar references public.rooms(room_id),
+  user_id varchar references public.users(user_id),
+  paid numeric not null default 0,
+  weight numeric not null default 0,
+  expense_count int4 not null default 0,
+  primary key (room_id, user_id)
+);
+
+-- Backfill from the expenses recorded so far
+insert into public.expense_ledger (room_id, user_id, paid, weight, expense_count)
+select room_id, user_id, coalesce(sum(amount), 0), coalesce(sum(weight), 0), count(*)
+from public.expenses
+where room_id is not null and user_id is not null
+group by room_id, user_id
+on conflict (room_id, user_id) do nothing;
@@ -1,5 +1,6 @@
 -- Minimal schema inferred from provided screenshots
 -- Safe to run multiple times: uses IF NOT EXISTS
+-- Snapshot of the current schema; changes go in migrations/ (see app/services/migrations.py)
 
 create table if not exists public.users (
   user_id varchar primary key,
@@ -63,3 +64,33 @@ create table if not exists public.sync_events (
   ts timestamp default now(),
   position_sec int4
 );
+
+-- Row ids give the chat timeline a stable tiebreaker for keyset pagination
+alter table public.chat add column if not exists id bigserial;
+alter table public.emojis add column if not exists id bigserial;
+
+create index if not exists chat_room_created_idx on public.chat (room_id, created_at, id);
+create index if not exists emojis_room_created_idx on public.emojis (room_id, created_at, id);
+
+create index if not exists votes_room_content_idx on public.votes (room_id, content_id);
+create index if not exists expenses_room_idx on public.expenses (room_id);
+create index if not exists sync_events_room_ts_idx on public.sync_events (room_id, ts);
+create index if not exists rooms_start_at_idx on public.rooms (start_at desc);
+
+create unique index if not exists votes_room_user_key on public.votes (room_id, user_id);
+create unique index if not exists candidates_room_content_key on public.candidates (room_id, content_id);
+
+create table if not exists public.seed_state (
+  name varchar primary key,
+  fingerprint varchar not null,
+  applied_at timestamp default now()
+);
+
+create table if not exists public.expense_ledger (
+  room_id varchar references public.rooms(room_id),
+  user_id varchar references public.users(user_id),
+  paid numeric not null default 0,
+  weight numeric not null default 0,
+  expense_count int4 not null default 0,
+  primary key (room_id, user_id)
+);
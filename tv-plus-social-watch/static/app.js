@@ -16,6 +16,7 @@ class TVPlusApp {
         this.partyStartTime = Date.now();
         this.serverHealth = 'connecting';
         this.lastPingTime = 0;
+        this.roomStateVersion = null;
         
         this.loadUserAndRoomData();
         this.init();
@@ -78,10 +79,12 @@ class TVPlusApp {
         this.startPartyTimer();
         this.startHealthMonitoring();
         
-        // Poll room status and voting every 3 seconds
+        // Room state is pushed over the WebSocket; poll only while it is down
         setInterval(() => {
-            this.checkRoomStatus();
-            this.checkVotingStatus();
+            if (!this.websocket || this.websocket.readyState !== WebSocket.OPEN) {
+                this.checkRoomStatus();
+                this.checkVotingStatus();
+            }
         }, 3000);
         
         console.log('TV+ App initialized with user:', this.userId, 'room:', this.roomId, 'isHost:', this.isHost);
@@ -366,12 +369,7 @@ class TVPlusApp {
                 this.showNotification('✓ Oyunuz kaydedildi!');
                 this.loadVoteTally();
                 await this.checkVotingStatus();
-                
-                // Notify other users via WebSocket
-                this.sendWebSocketEvent('vote_update', {
-                    user_id: this.userId,
-                    content_id: contentId
-                });
+                // Other members get the new tally pushed by the server
             } else {
                 this.showNotification('❌ Oy kaydedilemedi.');
             }
@@ -709,6 +707,7 @@ class TVPlusApp {
         
         this.websocket.onclose = () => {
             console.log('WebSocket disconnected');
+            this.roomStateVersion = null;
             // Update health status to disconnected
             if (this.updateHealthFromWebSocket) {
                 this.updateHealthFromWebSocket('disconnected');
@@ -732,34 +731,77 @@ class TVPlusApp {
             case 'emoji':
                 this.addChatMessage(this.getUserDisplayName(data.user_id), data.emoji);
                 break;
+            case 'emoji_burst':
+                // Reactions of one short window, aggregated by the server
+                Object.entries(data.counts || {}).forEach(([emoji, count]) => {
+                    this.addChatMessage('🎉', count > 1 ? `${emoji} ×${count}` : emoji);
+                });
+                break;
             case 'play_pause':
-                // Sync play/pause state
-                this.isPlaying = data.action === 'play';
-                this.currentTime = data.position;
+            case 'seek':
+                // Relays are coalesced, so a seek may stand in for an earlier
+                // play/pause; the attached clock snapshot has the full state
+                if (data.playback) {
+                    this.isPlaying = data.playback.playing;
+                    this.currentTime = Math.floor(data.playback.position);
+                } else {
+                    if (data.type === 'play_pause') {
+                        this.isPlaying = data.action === 'play';
+                    }
+                    this.currentTime = data.position;
+                }
                 this.updateProgress();
                 break;
-            case 'seek':
-                // Sync position
-                this.currentTime = data.position;
+            case 'sync_state':
+                // Authoritative position from the server clock
+                this.isPlaying = data.playing;
+                this.currentTime = Math.floor(data.position);
                 this.updateProgress();
                 break;
             case 'user_joined':
-                this.checkRoomStatus();
                 const joinedUserName = this.getUserDisplayName(data.user_id);
                 this.addChatMessage('Sistem', `${joinedUserName} odaya katıldı 👋`);
                 break;
             case 'user_left':
-                this.checkRoomStatus();
                 const leftUserName = this.getUserDisplayName(data.user_id);
                 this.addChatMessage('Sistem', `${leftUserName} odadan ayrıldı 👋`);
                 break;
-            case 'vote_update':
-                this.loadVoteTally();
-                this.checkVotingStatus();
+            case 'vote_tally':
+                // Tally pushed by the server after every vote
+                this.updateVoteCounts(data.tally || []);
+                break;
+            case 'room_state':
+                this.applyRoomState(data);
                 break;
         }
     }
     
+    applyRoomState(data) {
+        // Deltas must arrive in order; on a gap ask the server for a full snapshot
+        if (!data.full && (this.roomStateVersion === null || data.version !== this.roomStateVersion + 1)) {
+            this.sendWebSocketEvent('room_state_request', {});
+            return;
+        }
+        this.roomStateVersion = data.version;
+        const changes = data.changes || {};
+        
+        if ('user_count' in changes) {
+            this.roomUserCount = changes.user_count;
+            const roomUsersElement = document.getElementById('room-users');
+            if (roomUsersElement) {
+                roomUsersElement.textContent = `👥 ${this.roomUserCount} kişi`;
+            }
+        }
+        if ('votes' in changes) {
+            this.updateVotingProgress(changes.votes);
+        }
+        if ('winner' in changes) {
+            this.votingComplete = !!changes.winner;
+            this.selectedContent = changes.winner;
+            this.updateSelectedContent();
+        }
+    }
+    
     getUserDisplayName(userId) {
         // If it's the current user, show their name
         if (userId === this.userId && this.userData && this.userData.name) {